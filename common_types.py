@@ -2,6 +2,9 @@ from __future__ import print_function
 
 import dataclasses
 import enum
+import typing
+
+import numpy
 from colour import Color
 
 
@@ -18,6 +21,12 @@ def from_color_to_rgb_pixel(color: Color) -> RgbPixel:
         blue=int(color.blue*255)
     )
 
+def rgb_array(pixels: typing.Iterable[RgbPixel]) -> numpy.ndarray:
+    """
+    Packs RgbPixels into a (n, 3) uint8 array, one row per pixel.
+    """
+    return numpy.array([(pixel.red, pixel.green, pixel.blue) for pixel in pixels], dtype=numpy.uint8).reshape(-1, 3)
+
 
 
 class UpdateFrequency(enum.Enum):
@@ -0,0 +1,81 @@
+from __future__ import print_function
+
+import bisect
+import dataclasses
+import math
+import typing
+
+T = typing.TypeVar("T")
+
+
+@dataclasses.dataclass(frozen=True)
+class Cue(typing.Generic[T]):
+    """
+    A value that applies while the track elapsed time is between start and end.
+    Both ends are exclusive by default, like the `start < elapsed < end` checks the cues were programmed with.
+    """
+    start: float
+    end: float
+    value: T
+    start_inclusive: bool = False
+    end_inclusive: bool = False
+
+    def contains(self, elapsed: float) -> bool:
+        after_start = elapsed >= self.start if self.start_inclusive else elapsed > self.start
+        before_end = elapsed <= self.end if self.end_inclusive else elapsed < self.end
+        return after_start and before_end
+
+
+def during(value: T, *intervals: typing.Tuple[float, float]) -> typing.List[Cue[T]]:
+    """
+    The same value during several (start, end) intervals.
+    """
+    return [Cue(start, end, value) for start, end in intervals]
+
+
+def after(elapsed: float, value: T) -> Cue[T]:
+    return Cue(elapsed, math.inf, value)
+
+
+class CueList(typing.Generic[T]):
+    """
+    The cues for one aspect of a track (eye mode, smoke, ...), compiled for constant time playback.
+
+    When cues overlap, the first one declared wins, like in an if/elif chain. Outside all cues the default applies.
+    The cues are compiled into the sorted boundaries of the non overlapping segments they form, and the value of every
+    segment and boundary, so finding the active value is a bisect.
+    """
+
+    def __init__(self, cues: typing.Iterable[Cue[T]] = (), default: typing.Optional[T] = None):
+        self.cues = list(cues)
+        self.default = default
+
+        self.boundaries: typing.List[float] = sorted(
+            ({cue.start for cue in self.cues} | {cue.end for cue in self.cues}) - {-math.inf, math.inf})
+        # Segment i lies between boundary i - 1 and boundary i.
+        at_boundary: typing.List[typing.Optional[Cue[T]]] = [None] * len(self.boundaries)
+        between: typing.List[typing.Optional[Cue[T]]] = [None] * (len(self.boundaries) + 1)
+        for cue in self.cues:
+            first = self._boundary_index(cue.start)
+            last = self._boundary_index(cue.end)
+            for segment in range(first + 1, last + 1):
+                if between[segment] is None:
+                    between[segment] = cue
+            for boundary in range(max(first, 0), min(last + 1, len(self.boundaries))):
+                if at_boundary[boundary] is None and cue.contains(self.boundaries[boundary]):
+                    at_boundary[boundary] = cue
+        self.at_boundary = [cue.value if cue is not None else default for cue in at_boundary]
+        self.between = [cue.value if cue is not None else default for cue in between]
+
+    def _boundary_index(self, elapsed: float) -> int:
+        if elapsed == -math.inf:
+            return -1
+        if elapsed == math.inf:
+            return len(self.boundaries)
+        return bisect.bisect_left(self.boundaries, elapsed)
+
+    def at(self, elapsed: float) -> typing.Optional[T]:
+        index = bisect.bisect_left(self.boundaries, elapsed)
+        if index < len(self.boundaries) and self.boundaries[index] == elapsed:
+            return self.at_boundary[index]
+        return self.between[index]
@@ -0,0 +1,265 @@
+"""
+DMX over ethernet: Art-Net and sACN (E1.31) senders, and a receiver that decodes both.
+
+The senders look like the Enttec controller to the rest of the show: 512 channels and submit(), so they plug into
+submit_universe and the DmxOutputWorker unchanged. send() addresses any other universe directly. Every universe gets
+its own packet buffer, allocated once with the header filled in, and its own sequence number. A frame only copies the
+channels and the sequence number into the buffer before it goes out.
+
+Unlike the Enttec widget, network nodes do not keep repeating the last frame: sACN receivers drop a source after 2.5s
+without packets, Art-Net nodes expect a frame every 4s. refresh() resends the last frame of every universe that has
+been quiet for refresh_interval, the DmxOutputWorker calls it while nothing changes.
+
+tests/test_network.py checks both senders against the receiver over loopback, without hardware.
+"""
+from __future__ import print_function
+
+import abc
+import dataclasses
+import socket
+import struct
+import time
+import typing
+import uuid
+
+from dmx.universe import DMX_UNIVERSE_SIZE
+
+ARTNET_PORT = 6454
+ARTNET_ID = b"Art-Net\x00"
+ARTNET_OPCODE_DMX = 0x5000
+ARTNET_PROTOCOL_VERSION = 14
+ARTNET_HEADER = struct.Struct("<8sH")  # id, opcode (little endian)
+ARTNET_DMX_HEADER = struct.Struct(">HBBBBH")  # protocol version, sequence, physical, sub universe, net, length
+ARTNET_DATA_OFFSET = ARTNET_HEADER.size + ARTNET_DMX_HEADER.size
+
+SACN_PORT = 5568
+SACN_PACKET_ID = b"ASC-E1.17\x00\x00\x00"
+SACN_VECTOR_ROOT_DATA = 0x00000004
+SACN_VECTOR_FRAMING_DATA = 0x00000002
+SACN_VECTOR_DMP_SET_PROPERTY = 0x02
+SACN_SEQUENCE_OFFSET = 111
+SACN_UNIVERSE_OFFSET = 113
+SACN_DATA_OFFSET = 126
+
+
+def artnet_packet(universe: int, size: int = DMX_UNIVERSE_SIZE) -> bytearray:
+    """
+    An ArtDmx packet for the (15 bit port address) universe, channels and sequence left at 0.
+    """
+    packet = bytearray(ARTNET_DATA_OFFSET + size)
+    ARTNET_HEADER.pack_into(packet, 0, ARTNET_ID, ARTNET_OPCODE_DMX)
+    ARTNET_DMX_HEADER.pack_into(packet, ARTNET_HEADER.size,
+                                ARTNET_PROTOCOL_VERSION, 0, 0, universe & 0xFF, (universe >> 8) & 0x7F, size)
+    return packet
+
+
+def sacn_packet(universe: int, cid: bytes, source_name: str, priority: int = 100,
+                size: int = DMX_UNIVERSE_SIZE) -> bytearray:
+    """
+    An E1.31 data packet for the universe, channels and sequence left at 0.
+    """
+    length = SACN_DATA_OFFSET + size
+    packet = bytearray(length)
+    # Root layer
+    struct.pack_into(">HH12sHI16s", packet, 0,
+                     0x0010, 0x0000, SACN_PACKET_ID, 0x7000 | (length - 16), SACN_VECTOR_ROOT_DATA, cid)
+    # Framing layer
+    struct.pack_into(">HI64sBHBBH", packet, 38,
+                     0x7000 | (length - 38), SACN_VECTOR_FRAMING_DATA, source_name.encode("utf-8")[:63], priority,
+                     0, 0, 0, universe)
+    # DMP layer, start code 0 in front of the channels
+    struct.pack_into(">HBBHHHB", packet, 115,
+                     0x7000 | (length - 115), SACN_VECTOR_DMP_SET_PROPERTY, 0xA1, 0x0000, 0x0001, size + 1, 0)
+    return packet
+
+
+def sacn_multicast_address(universe: int) -> str:
+    return "239.255.{}.{}".format((universe >> 8) & 0xFF, universe & 0xFF)
+
+
+class NetworkDmxSender(abc.ABC):
+    """
+    Sends DMX universes over UDP, one preallocated packet per universe.
+    Use ArtNetSender or SacnSender.
+    """
+    DATA_OFFSET = 0
+
+    def __init__(self, universe: int, refresh_interval: float = 1.0,
+                 clock: typing.Callable[[], float] = time.monotonic):
+        self.universe = universe
+        """The universe channels and submit send to."""
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.channels = bytearray(DMX_UNIVERSE_SIZE)
+        self.packets: typing.Dict[int, bytearray] = {}
+        self.sequences: typing.Dict[int, int] = {}
+        self.sent_at: typing.Dict[int, float] = {}
+        """When the last packet of every universe went out."""
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.socket.setblocking(False)
+
+    def submit(self) -> None:
+        self.send(self.universe, self.channels)
+
+    def send(self, universe: int, data: typing.Union[bytes, bytearray, memoryview]) -> None:
+        """
+        Sends up to 512 channels to the universe. Raises OSError when the network does not take the packet.
+        """
+        packet = self.packets.get(universe)
+        if packet is None:
+            packet = self.packets[universe] = self._packet(universe)
+            self.sequences[universe] = 0
+        packet[self.DATA_OFFSET:self.DATA_OFFSET + len(data)] = data
+        self._send_packet(universe, packet)
+
+    def refresh(self) -> int:
+        """
+        Resends the last frame of the universes nothing was sent to for refresh_interval. Returns how many.
+        Raises OSError when the network does not take a packet.
+        """
+        now = self.clock()
+        stale = [universe for universe, sent_at in self.sent_at.items() if now - sent_at >= self.refresh_interval]
+        for universe in stale:
+            self._send_packet(universe, self.packets[universe])
+        return len(stale)
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def _send_packet(self, universe: int, packet: bytearray) -> None:
+        self.sequences[universe] = sequence = self._next_sequence(self.sequences[universe])
+        self._set_sequence(packet, sequence)
+        self.socket.sendto(packet, self._address(universe))
+        self.sent_at[universe] = self.clock()
+
+    @abc.abstractmethod
+    def _packet(self, universe: int) -> bytearray:
+        pass
+
+    @abc.abstractmethod
+    def _address(self, universe: int) -> typing.Tuple[str, int]:
+        pass
+
+    def _next_sequence(self, sequence: int) -> int:
+        return (sequence + 1) % 256
+
+    @abc.abstractmethod
+    def _set_sequence(self, packet: bytearray, sequence: int) -> None:
+        pass
+
+
+class ArtNetSender(NetworkDmxSender):
+    """
+    Art-Net (ArtDmx) to a node, or broadcast. Universes are 15 bit port addresses (net, sub net and universe).
+    """
+    DATA_OFFSET = ARTNET_DATA_OFFSET
+
+    def __init__(self, host: str, universe: int = 0, port: int = ARTNET_PORT, refresh_interval: float = 1.0):
+        super().__init__(universe, refresh_interval)
+        self.host = host
+        self.port = port
+
+    def _packet(self, universe: int) -> bytearray:
+        return artnet_packet(universe)
+
+    def _address(self, universe: int) -> typing.Tuple[str, int]:
+        return self.host, self.port
+
+    def _next_sequence(self, sequence: int) -> int:
+        # 0 tells the node not to reorder, the sequence runs 1 to 255.
+        return sequence % 255 + 1
+
+    def _set_sequence(self, packet: bytearray, sequence: int) -> None:
+        packet[ARTNET_HEADER.size + 2] = sequence
+
+
+class SacnSender(NetworkDmxSender):
+    """
+    sACN (E1.31) to the multicast group of every universe, or to one host (unicast).
+    """
+    DATA_OFFSET = SACN_DATA_OFFSET
+
+    def __init__(self, host: typing.Optional[str] = None, universe: int = 1, port: int = SACN_PORT,
+                 source_name: str = "midimachine", priority: int = 100, cid: typing.Optional[bytes] = None,
+                 refresh_interval: float = 1.0):
+        super().__init__(universe, refresh_interval)
+        self.host = host
+        """None sends to the multicast group of each universe."""
+        self.port = port
+        self.source_name = source_name
+        self.priority = priority
+        self.cid = cid if cid is not None else uuid.uuid4().bytes
+        """Identifies this source to the receivers, the same for all its universes."""
+
+    def _packet(self, universe: int) -> bytearray:
+        return sacn_packet(universe, self.cid, self.source_name, self.priority)
+
+    def _address(self, universe: int) -> typing.Tuple[str, int]:
+        return (self.host if self.host is not None else sacn_multicast_address(universe)), self.port
+
+    def _set_sequence(self, packet: bytearray, sequence: int) -> None:
+        packet[SACN_SEQUENCE_OFFSET] = sequence
+
+
+@dataclasses.dataclass(frozen=True)
+class DmxPacket:
+    protocol: str
+    """"artnet" or "sacn"."""
+    universe: int
+    sequence: int
+    data: bytes
+
+
+def decode_packet(packet: bytes) -> typing.Optional[DmxPacket]:
+    """
+    Decodes an ArtDmx or E1.31 data packet. None for anything else.
+    """
+    if packet.startswith(ARTNET_ID) and len(packet) >= ARTNET_DATA_OFFSET:
+        _, opcode = ARTNET_HEADER.unpack_from(packet, 0)
+        if opcode != ARTNET_OPCODE_DMX:
+            return None
+        _, sequence, _, sub_universe, net, length = ARTNET_DMX_HEADER.unpack_from(packet, ARTNET_HEADER.size)
+        return DmxPacket("artnet", (net << 8) | sub_universe, sequence,
+                         bytes(packet[ARTNET_DATA_OFFSET:ARTNET_DATA_OFFSET + length]))
+    if packet[4:16] == SACN_PACKET_ID and len(packet) >= SACN_DATA_OFFSET:
+        _, root_vector = struct.unpack_from(">HI", packet, 16)
+        _, framing_vector = struct.unpack_from(">HI", packet, 38)
+        if root_vector != SACN_VECTOR_ROOT_DATA or framing_vector != SACN_VECTOR_FRAMING_DATA:
+            return None
+        universe, = struct.unpack_from(">H", packet, SACN_UNIVERSE_OFFSET)
+        values, = struct.unpack_from(">H", packet, 123)
+        if packet[125] != 0:
+            # Not DMX data (another start code)
+            return None
+        return DmxPacket("sacn", universe, packet[SACN_SEQUENCE_OFFSET],
+                         bytes(packet[SACN_DATA_OFFSET:SACN_DATA_OFFSET + values - 1]))
+    return None
+
+
+class DmxReceiver:
+    """
+    Receives and decodes Art-Net and sACN packets on a UDP port. Port 0 picks a free port, see port.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.port = self.socket.getsockname()[1]
+
+    def receive(self, timeout: typing.Optional[float] = 1.0) -> typing.Optional[DmxPacket]:
+        """
+        The next DMX packet, None when none arrives within the timeout. Other packets are skipped.
+        """
+        self.socket.settimeout(timeout)
+        while True:
+            try:
+                packet = self.socket.recv(2048)
+            except socket.timeout:
+                return None
+            decoded = decode_packet(packet)
+            if decoded is not None:
+                return decoded
+
+    def close(self) -> None:
+        self.socket.close()
@@ -0,0 +1,125 @@
+from __future__ import print_function
+
+import sys
+import threading
+import time
+import typing
+
+from dmx.network import NetworkDmxSender
+from dmx.universe import DmxUniverse
+from profiling import PROFILER
+
+
+class DmxOutputWorker:
+    """
+    Writes universes to the DMX controller on its own thread, so a slow or stuck USB serial link never stalls rendering.
+
+    The output loop hands over the latest universe with send, which never waits for the serial link. There is room
+    for one pending frame per universe: a newer one replaces it (the replaced one is counted as dropped), the worker
+    always writes the newest. Numbered universes go to the send of a network sender, the universe without a number
+    to the controller's channels. A failed write is reported and retried with the newest universe after retry_interval.
+    Write times go to the "dmx write" stage of the profiler.
+    While nothing changes, the last frames are resent to a network sender every refresh_interval of the sender, so
+    the nodes do not drop the show.
+    """
+
+    def __init__(self, dmx_controller, retry_interval: float = 0.1, clock: typing.Callable[[], float] = time.perf_counter):
+        self.dmx_controller = dmx_controller
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.failures = 0
+        self.last_error: typing.Optional[BaseException] = None
+        self.last_write = 0.0
+        self.max_write = 0.0
+        self._write_timer = PROFILER.stage("dmx write")
+        self._pending: typing.Dict[typing.Optional[int], bytes] = {}
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="dmx-output", daemon=True)
+
+    def start(self) -> None:
+        self._running = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+    def send(self, universe: DmxUniverse, number: typing.Optional[int] = None) -> bool:
+        """
+        Hands the universe to the worker, under its number for a network sender. Identical universes are not sent
+        again, like submit_universe. Returns whether the universe was handed over.
+        """
+        if universe.submitted is not None and universe.data == universe.submitted:
+            return False
+        data = bytes(universe.data)
+        universe.submitted = data
+        with self._condition:
+            if number in self._pending:
+                self.frames_dropped += 1
+            self._pending[number] = data
+            self._condition.notify()
+        return True
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "failures": self.failures,
+            "last_error": repr(self.last_error) if self.last_error is not None else None,
+            "last_write_ms": self.last_write * 1000,
+            "max_write_ms": self.max_write * 1000,
+        }
+
+    def _run(self) -> None:
+        refresh = isinstance(self.dmx_controller, NetworkDmxSender)
+        while True:
+            with self._condition:
+                if not self._pending and self._running:
+                    self._condition.wait(self.dmx_controller.refresh_interval / 2 if refresh else None)
+                if not self._running:
+                    return
+                if not self._pending:
+                    number, data = None, None
+                else:
+                    number = next(iter(self._pending))
+                    data = self._pending.pop(number)
+
+            if data is None:
+                if refresh:
+                    try:
+                        self.dmx_controller.refresh()
+                    except OSError as e:
+                        self._report(e)
+                continue
+
+            started = self.clock()
+            try:
+                if number is None:
+                    self.dmx_controller.channels[0:len(data)] = data
+                    self.dmx_controller.submit()
+                else:
+                    self.dmx_controller.send(number, data)
+            except Exception as e:
+                # Whatever the driver or the serial link raises, rendering goes on. Keep the newest universe to retry.
+                self._report(e)
+                with self._condition:
+                    self._pending.setdefault(number, data)
+                    self._condition.wait(self.retry_interval)
+                continue
+
+            took = self.clock() - started
+            self._write_timer.add(took)
+            self.last_write = took
+            self.max_write = max(self.max_write, took)
+            self.frames_sent += 1
+
+    def _report(self, error: BaseException) -> None:
+        self.failures += 1
+        if self.last_error is None or repr(error) != repr(self.last_error):
+            print("DMX write failed: {!r}".format(error), file=sys.stderr)
+        self.last_error = error
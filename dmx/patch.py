@@ -0,0 +1,173 @@
+"""
+The patch: which fixture of the stage goes to which DMX universe and address, with which channel personality.
+
+A patch table is a list of PatchEntries, in code or in a JSON patch file (see load_patch):
+
+    [{"fixture": "lightbar_one", "personality": "pixel bar 96ch", "universe": 1, "address": 1},
+     {"fixture": "dragon_left", "part": "left_eye", "personality": "LED PAR 7ch", "universe": 1, "address": 289}]
+
+compile_patch turns it into a flat gather/scatter index map. The constant channels of every personality (a master
+dimmer at 255, a color select at 0) are written into the universes once, from the personality's byte template. The
+stage is gathered into a flat buffer of fixture values, laid out by a FixtureLayout. For every variable channel the
+map holds the index of its value in that buffer, and its index in the output: all universes back to back, 512
+channels each. Rendering a frame then is a single numpy copy of the variable channels of the fixtures that changed.
+"""
+import dataclasses
+import functools
+import json
+import typing
+
+import numpy
+
+from dmx.universe import DMX_UNIVERSE_SIZE, DmxUniverse
+
+
+@dataclasses.dataclass(frozen=True)
+class Personality:
+    """
+    The channel layout of a type of fixture.
+    """
+    name: str
+    channels: typing.Tuple[typing.Union[str, int], ...]
+    """Per DMX channel: the name of the fixture value it carries, or a constant."""
+
+    def __post_init__(self):
+        for channel in self.channels:
+            if isinstance(channel, int) and not 0 <= channel <= 255:
+                raise ValueError("Constant {} of {} is not a DMX value".format(channel, self.name))
+
+    @functools.cached_property
+    def template(self) -> bytes:
+        """The channels with the constants filled in, variable channels at 0."""
+        return bytes(channel if isinstance(channel, int) else 0 for channel in self.channels)
+
+    @functools.cached_property
+    def variables(self) -> typing.Tuple[typing.Tuple[int, str], ...]:
+        """Offset and value name of the variable channels."""
+        return tuple((i, channel) for i, channel in enumerate(self.channels) if not isinstance(channel, int))
+
+
+@dataclasses.dataclass(frozen=True)
+class PatchEntry:
+    fixture: str
+    """The stage fixture, by the name the FixtureLayout gives it."""
+    personality: Personality
+    universe: int
+    address: int
+    """First DMX channel, 1-indexed like in the fixture manuals."""
+    part: typing.Optional[str] = None
+    """For stage fixtures made of several DMX fixtures (a dragon's eyes and smoke machine): the part patched here.
+    The personality's value names are looked up as "part.name"."""
+
+
+@dataclasses.dataclass(frozen=True)
+class FixtureLayout:
+    """
+    Where the values of every stage fixture are in the flat value buffer, and how to gather them from a stage.
+    """
+    fixtures: typing.Dict[str, typing.Tuple[int, typing.Tuple[str, ...]]]
+    """Fixture name: offset of its values in the buffer, and their names."""
+    size: int
+    gather: typing.Callable[[typing.Any, numpy.ndarray, typing.Optional[typing.Set[str]]], None]
+    """gather(stage, values, changed) writes the values of the fixtures in changed (all if None) into the buffer."""
+
+
+class CompiledPatch:
+    """
+    A patch table compiled into a gather/scatter index map, with the value buffer and the universes it renders to.
+    """
+
+    def __init__(self, layout: FixtureLayout, universe_numbers: typing.Sequence[int], template: numpy.ndarray,
+                 fixture_index: typing.Dict[str, typing.Tuple[numpy.ndarray, numpy.ndarray]]):
+        self.layout = layout
+        self.values = numpy.zeros(layout.size, dtype=numpy.uint8)
+        """The fixture values of the stage."""
+        self.fixture_index = fixture_index
+        """Per patched fixture: the value index and output index of its variable channels."""
+        self.value_index = numpy.concatenate([index for index, _ in fixture_index.values()] or [[]]).astype(numpy.intp)
+        self.output_index = numpy.concatenate([index for _, index in fixture_index.values()] or [[]]).astype(numpy.intp)
+        self.output = template.copy()
+        """All patched universes, one row each. The constant channels are in place from the start."""
+        self._flat_output = self.output.reshape(-1)
+        self.universes: typing.Dict[int, DmxUniverse] = {
+            number: DmxUniverse(buffer=memoryview(self.output[row]))
+            for row, number in enumerate(universe_numbers)
+        }
+        """The patched universes by number, lowest first. Views into output, they change with every render."""
+
+    def render(self, stage, changed: typing.Optional[typing.Set[str]] = None) -> None:
+        """
+        Renders the stage into the universes. If given, only the fixtures named in changed are gathered and written
+        again.
+        """
+        self.layout.gather(stage, self.values, changed)
+        if changed is None:
+            self._flat_output[self.output_index] = self.values[self.value_index]
+            return
+        for name in changed:
+            index = self.fixture_index.get(name)
+            if index is not None:
+                self._flat_output[index[1]] = self.values[index[0]]
+
+
+def compile_patch(entries: typing.Sequence[PatchEntry], layout: FixtureLayout) -> CompiledPatch:
+    """
+    Raises ValueError for unknown fixtures or values, channels outside the universe, and channels patched twice.
+    """
+    universe_numbers = sorted({entry.universe for entry in entries})
+    rows = {number: row for row, number in enumerate(universe_numbers)}
+    template = numpy.zeros((len(universe_numbers), DMX_UNIVERSE_SIZE), dtype=numpy.uint8)
+    value_index: typing.Dict[str, typing.List[int]] = {}
+    output_index: typing.Dict[str, typing.List[int]] = {}
+    patched: typing.Dict[typing.Tuple[int, int], PatchEntry] = {}
+    for entry in entries:
+        if entry.fixture not in layout.fixtures:
+            raise ValueError("Unknown fixture {!r}".format(entry.fixture))
+        offset, names = layout.fixtures[entry.fixture]
+        value_offsets = {name: offset + i for i, name in enumerate(names)}
+        if not 1 <= entry.address <= DMX_UNIVERSE_SIZE - len(entry.personality.channels) + 1:
+            raise ValueError("{} ({}) does not fit in universe {} at address {}".format(
+                entry.fixture, entry.personality.name, entry.universe, entry.address))
+        for address in range(entry.address, entry.address + len(entry.personality.channels)):
+            if (entry.universe, address) in patched:
+                raise ValueError("Universe {} channel {} is patched to both {} and {}".format(
+                    entry.universe, address, patched[(entry.universe, address)].fixture, entry.fixture))
+            patched[(entry.universe, address)] = entry
+
+        start = entry.address - 1
+        row = rows[entry.universe]
+        template[row, start:start + len(entry.personality.template)] = numpy.frombuffer(entry.personality.template,
+                                                                                         dtype=numpy.uint8)
+        for i, channel in entry.personality.variables:
+            name = channel if entry.part is None else "{}.{}".format(entry.part, channel)
+            if name not in value_offsets:
+                raise ValueError("{} has no value {!r} for {}".format(entry.fixture, name, entry.personality.name))
+            value_index.setdefault(entry.fixture, []).append(value_offsets[name])
+            output_index.setdefault(entry.fixture, []).append(row * DMX_UNIVERSE_SIZE + start + i)
+
+    return CompiledPatch(layout, universe_numbers, template, {
+        fixture: (numpy.array(value_index[fixture], dtype=numpy.intp),
+                  numpy.array(output_index[fixture], dtype=numpy.intp))
+        for fixture in value_index
+    })
+
+
+def load_patch(path: str, personalities: typing.Dict[str, Personality]) -> typing.List[PatchEntry]:
+    """
+    Reads a JSON patch file, personalities by name. Raises ValueError for an invalid file.
+    """
+    with open(path) as patch_file:
+        source = json.load(patch_file)
+    entries = []
+    for i, entry in enumerate(source):
+        try:
+            entries.append(PatchEntry(
+                fixture=entry["fixture"],
+                personality=personalities[entry["personality"]],
+                universe=int(entry["universe"]),
+                address=int(entry["address"]),
+                part=entry.get("part"),
+            ))
+        except (KeyError, TypeError) as e:
+            raise ValueError("Patch entry {}: {!r}".format(i, e))
+    return entries
@@ -0,0 +1,27 @@
+"""
+Channel personalities of the fixtures in the rig, by the name patch files use.
+
+A new type of fixture only needs an entry here: its channels in order, a value name for the channels the stage
+drives and the constant for the others. The patch writes the constants once, from the personality's template.
+"""
+import typing
+
+from dmx.patch import Personality
+
+PIXELS_PER_BAR = 32
+
+PIXEL_BAR_VALUES = tuple("pixel{}.{}".format(pixel, color)
+                         for pixel in range(PIXELS_PER_BAR) for color in ("red", "green", "blue"))
+
+PIXEL_BAR_96CH = Personality("pixel bar 96ch", PIXEL_BAR_VALUES)
+"""32 RGB pixels, 3 channels each."""
+
+LED_PAR_7CH = Personality("LED PAR 7ch", (255, "red", "green", "blue", 0, 0, 0))
+"""Master dimmer, red, green, blue, then mode, strobe speed and fade mode left at 0. Not an RGB blend, just R, G or B."""
+
+SMOKE_MACHINE_6CH = Personality("smoke machine 6ch", ("emit", 0, 0, "emit", 0, 0))
+"""Smoke emit, color select (0), red, green, blue and one unused channel. The green LEDs light up with the smoke."""
+
+PERSONALITIES: typing.Dict[str, Personality] = {
+    personality.name: personality for personality in (PIXEL_BAR_96CH, LED_PAR_7CH, SMOKE_MACHINE_6CH)
+}
@@ -0,0 +1,50 @@
+from __future__ import print_function
+
+import typing
+
+DMX_UNIVERSE_SIZE = 512
+
+
+class DmxUniverse:
+    """
+    A packed 512 slot DMX universe.
+
+    Fixtures render into the universe with slice assignment, and the whole buffer is handed to the
+    controller once per frame. Channels are 1-indexed like in the fixture manuals.
+    """
+
+    def __init__(self, size: int = DMX_UNIVERSE_SIZE, buffer: typing.Optional[memoryview] = None):
+        """
+        buffer, if given, is the writable memory the universe lives in (a row of a compiled patch's output).
+        """
+        self.data: typing.Union[bytearray, memoryview] = bytearray(size) if buffer is None else buffer
+        self.view = memoryview(self.data)
+        self.submitted: typing.Optional[bytes] = None
+        """The universe as it was last handed to the controller."""
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def write(self, channel: int, values: typing.Union[bytes, bytearray, memoryview, typing.Sequence[int]]) -> None:
+        """
+        Write a run of channel values, starting at the (1-indexed) channel.
+        """
+        start = channel - 1
+        self.view[start:start + len(values)] = bytes(values) if isinstance(values, (list, tuple)) else values
+
+    def clear(self) -> None:
+        self.view[:] = bytes(len(self.data))
+
+
+def submit_universe(universe: DmxUniverse, dmx_controller) -> bool:
+    """
+    Hand the complete universe to the Enttec controller in one go, and submit it.
+    Identical frames are not submitted again, the Enttec widget keeps refreshing the DMX line with the last frame.
+    Returns whether the universe was submitted.
+    """
+    if universe.submitted is not None and universe.data == universe.submitted:
+        return False
+    dmx_controller.channels[0:len(universe)] = universe.data
+    dmx_controller.submit()
+    universe.submitted = bytes(universe.data)
+    return True
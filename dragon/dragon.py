@@ -1,5 +1,7 @@
 from __future__ import print_function
 
+import typing
+
 from common_types import RgbPixel
 from utils import generate_random_color
 
@@ -11,4 +13,9 @@ class Dragon:
         self.right_eye: RgbPixel = generate_random_color()
         """NOTE that this does not do RGB color blend, it is just R, G nad B"""
         self.smoke_machine_on: bool = False # Smoke machines should always prefer OFF. Expensive...
-        self.label = label
\ No newline at end of file
+        self.label = label
+
+    def state(self) -> typing.Tuple[int, int, int, int, int, int, bool]:
+        return (self.left_eye.red, self.left_eye.green, self.left_eye.blue,
+                self.right_eye.red, self.right_eye.green, self.right_eye.blue,
+                self.smoke_machine_on)
@@ -0,0 +1,77 @@
+"""
+The programmed tracks for the dragons. Edit the setlist here, the render code does not need to change.
+"""
+import dataclasses
+import typing
+
+from cues import CueList, during
+from dragon.dragon_modes import DragonMode
+
+
+@dataclasses.dataclass
+class DragonTrackCues:
+    mode: CueList[DragonMode]
+    smoke: typing.Optional[CueList[bool]] = None
+    """None leaves the smoke machines to the effect, e.g. Thomas firing them himself."""
+
+
+def pulsing_with_smoke(*intervals: typing.Tuple[float, float]) -> DragonTrackCues:
+    return DragonTrackCues(
+        mode=CueList(default=DragonMode.PULSING_EYES),
+        smoke=CueList(during(True, *intervals), default=False),
+    )
+
+
+def crazy_with_smoke(*intervals: typing.Tuple[float, float]) -> DragonTrackCues:
+    """Crazy eyes and smoke together, pulsing eyes in between."""
+    return DragonTrackCues(
+        mode=CueList(during(DragonMode.CRAZY_EYES, *intervals), default=DragonMode.PULSING_EYES),
+        smoke=CueList(during(True, *intervals), default=False),
+    )
+
+
+DEFAULT_DRAGON_CUES = pulsing_with_smoke()
+"""For tracks that are not programmed."""
+
+DRAGON_CUES: typing.Dict[str, DragonTrackCues] = {
+    "Biggie smalls the tank engine": DragonTrackCues(mode=CueList(default=DragonMode.THOMAS_THE_TANK_ENGINE)),
+    "Make Me Thomas (feat. Jawn Legend)": DragonTrackCues(mode=CueList(default=DragonMode.THOMAS_THE_TANK_ENGINE)),
+    "Amberina Sun": DragonTrackCues(
+        mode=CueList(during(DragonMode.PULSING_EYES, (209, 249.5)), default=DragonMode.ALL_OFF),
+        smoke=CueList(during(True, (230, 234)), default=False),
+    ),
+    "The Girl and the Robot": DragonTrackCues(
+        mode=CueList(
+            during(DragonMode.PULSING_EYES, (16, 31), (80, 95), (144, 158), (159, 173)) +
+            during(DragonMode.CRAZY_EYES, (48, 78), (111, 126), (134, 159), (198, 236), (0, 16)),
+            default=DragonMode.EYES_OFF),
+        smoke=CueList(during(True, (21, 31), (127, 134)), default=False),
+    ),
+    "Junkyard Dunebuggy": pulsing_with_smoke((172.3, 173.3), (182.6, 186), (192.1, 195), (96.1, 97.1), (220.3, 221.6)),
+    "We Don't Need Another Hero (Thunderdome)": pulsing_with_smoke(
+        (14.8, 16.8), (17.3, 19.3),
+        (34, 36), (36.5, 38.5),
+        (107, 109), (109.5, 111.5),
+        (126.5, 128.5), (129, 131),
+        (201, 205),
+        (53.5, 55.5), (56.0, 58.0)),
+    "Hot": pulsing_with_smoke((66.6, 70), (175.2, 178)),
+    "You Can Do It": pulsing_with_smoke((194.5, 209.9)),
+    "The Final Countdown": pulsing_with_smoke((53.86, 78.0), (119, 123.0), (168, 174.0), (253, 255.0)),
+    "Santa Catarina": pulsing_with_smoke((217, 233)),
+    "Cha Cha Cha": crazy_with_smoke(
+        (34.2, 37), (40.3, 43.1), (46.1, 49.4), (83.7, 86.5), (89.9, 92.7), (96.1, 98.8), (161.1, 164), (167.3, 170)),
+    "Tor Kraft": pulsing_with_smoke((42.96, 46.6), (90.8, 95), (104.2, 107.2), (120.8, 126.6)),
+    "Time Machine": pulsing_with_smoke((54.8, 59), (133.5, 140), (178.5, 188)),
+    "Gentleman": pulsing_with_smoke((8.1, 15.7), (61.4, 70), (124, 134), (162.4, 172)),
+    "Hogwarts' March - Flawless Remix": crazy_with_smoke((52, 54), (67, 69), (112.7, 115)),
+    "Skibidi (Romantic Edition)": pulsing_with_smoke((7.9, 14.5)),
+    "City Boy": pulsing_with_smoke((134, 144)),
+    "10 Years (Chromeo Remix)": pulsing_with_smoke((135.7, 143)),
+    "Bitter Kitten": crazy_with_smoke((69.1, 79)),
+    "Disco Guy (Original Version)": pulsing_with_smoke((193, 213)),
+    "Jeg Vil Bare Danse": pulsing_with_smoke((52.4, 55), (134.7, 137)),
+    "Crescendolls": pulsing_with_smoke((145, 148)),
+    "Keep Moving": pulsing_with_smoke((115.0, 117), (121.0, 123), (125.6, 128), (130, 132), (149.3, 151)),
+    "Bezos I": crazy_with_smoke((41.5, 56)),
+}
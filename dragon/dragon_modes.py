@@ -0,0 +1,16 @@
+from enum import Enum
+
+
+class LastFired(Enum):
+    LEFT = 1
+    RIGHT = 2
+
+class ThomasState:
+    last_fired: LastFired = LastFired.RIGHT
+
+class DragonMode(Enum):
+    THOMAS_THE_TANK_ENGINE = 1
+    EYES_OFF = 2
+    ALL_OFF = 3
+    PULSING_EYES = 4
+    CRAZY_EYES = 5
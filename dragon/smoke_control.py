@@ -0,0 +1,87 @@
+from __future__ import print_function
+
+import dataclasses
+import typing
+
+from dragon.dragon import Dragon
+from stage.timed_actions import TimedActions
+
+
+@dataclasses.dataclass
+class SmokePolicy:
+    """
+    Limits for the smoke machines. Smoke is expensive, and the machines need time to heat up again.
+    """
+    min_off: float = 0.4
+    """Seconds a machine stays off before it may smoke again."""
+    max_on: float = 30.0
+    """Seconds a machine may smoke in one go. After that it stays off until the smoke is asked off."""
+
+
+class SmokeControl:
+    """
+    Switches the smoke machine of one dragon, enforcing the SmokePolicy.
+
+    The cues ask for smoke on or off every pulse (set), effects fire bursts (burst). The switch offs that have to
+    happen later, the end of a burst and the max_on cut off, are TimedActions.
+    """
+
+    def __init__(self, dragon: Dragon, timed_actions: TimedActions, policy: typing.Optional[SmokePolicy] = None):
+        self.dragon = dragon
+        self.timed_actions = timed_actions
+        self.policy = policy if policy is not None else SmokePolicy()
+        self.off_since: typing.Optional[float] = None
+        """When the machine was last switched off, None if it never smoked."""
+        self.cut_off = False
+        """Smoked for max_on, stays off until asked off."""
+        self._generation = 0
+        """Counts the switch ons, so actions scheduled for an earlier one do nothing."""
+        self.refused = 0
+        """Switch ons the policy refused."""
+
+    def set(self, on: bool) -> bool:
+        """
+        Asks for smoke on or off. Returns whether the machine is on now.
+        """
+        if not on:
+            self.cut_off = False
+            self._switch_off()
+            return False
+        if not self.dragon.smoke_machine_on:
+            self._switch_on()
+        return self.dragon.smoke_machine_on
+
+    def burst(self, duration: float) -> bool:
+        """
+        Smoke for duration seconds, unless the policy does not allow it now. Returns whether the burst started.
+        """
+        if self.dragon.smoke_machine_on or not self._switch_on():
+            return False
+        generation = self._generation
+        self.timed_actions.after(duration, lambda: self._end(generation))
+        return True
+
+    def _switch_on(self) -> bool:
+        now = self.timed_actions.clock()
+        if self.cut_off or (self.off_since is not None and now - self.off_since < self.policy.min_off):
+            self.refused += 1
+            return False
+        self._generation += 1
+        self.dragon.smoke_machine_on = True
+        generation = self._generation
+        self.timed_actions.at(now + self.policy.max_on, lambda: self._cut_off(generation))
+        return True
+
+    def _switch_off(self):
+        if self.dragon.smoke_machine_on:
+            self.dragon.smoke_machine_on = False
+            self.off_since = self.timed_actions.clock()
+
+    def _end(self, generation: int):
+        if generation == self._generation:
+            self._switch_off()
+
+    def _cut_off(self, generation: int):
+        if generation == self._generation and self.dragon.smoke_machine_on:
+            self.cut_off = True
+            self._switch_off()
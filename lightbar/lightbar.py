@@ -2,26 +2,75 @@ from __future__ import print_function
 
 import typing
 
-from common_types import RgbPixel
+import numpy
+
+from common_types import RgbPixel, rgb_array
 from utils import generate_random_color
 
+PIXELS_PER_LIGHTBAR = 32
+
+
+class PixelView:
+    """
+    RgbPixel compatible view over a (n, 3) uint8 pixel array.
+    Reads give out RgbPixel copies, writes go straight into the array.
+    """
+
+    def __init__(self, rgb: numpy.ndarray):
+        self.rgb = rgb
+
+    def __len__(self) -> int:
+        return len(self.rgb)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RgbPixel(red, green, blue) for red, green, blue in self.rgb[index].tolist()]
+        red, green, blue = self.rgb[index].tolist()
+        return RgbPixel(red, green, blue)
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            self.rgb[index] = rgb_array(color)
+        else:
+            self.rgb[index] = (color.red, color.green, color.blue)
+
+    def __iter__(self) -> typing.Iterator[RgbPixel]:
+        for red, green, blue in self.rgb.tolist():
+            yield RgbPixel(red, green, blue)
+
+    def reverse(self):
+        self.rgb[:] = self.rgb[::-1].copy()
+
 
 class LightBar:
     """
     A class for working with the lightbar in 96 channel mode.
     TODO: Light bar model name name
 
+    The pixels live in a (32, 3) uint8 array, which is typically a view into the stage's lightbar strip.
     """
 
-    def __init__(self, label: str):
-        self.pixels: typing.List[RgbPixel] = [generate_random_color() for _ in range(32)]
+    def __init__(self, label: str, rgb: typing.Optional[numpy.ndarray] = None):
+        if rgb is None:
+            rgb = numpy.zeros((PIXELS_PER_LIGHTBAR, 3), dtype=numpy.uint8)
+        if rgb.shape != (PIXELS_PER_LIGHTBAR, 3):
+            raise ValueError("Lightbar pixels must be a (32, 3) array.")
+        self.rgb: numpy.ndarray = rgb
+        self.rgb[:] = rgb_array(generate_random_color() for _ in range(PIXELS_PER_LIGHTBAR))
         self.label = label
 
+    @property
+    def pixels(self) -> PixelView:
+        return PixelView(self.rgb)
+
+    @pixels.setter
+    def pixels(self, pixels: typing.Iterable[RgbPixel]):
+        self.rgb[:] = pixels.rgb if isinstance(pixels, PixelView) else rgb_array(pixels)
+
     def set_pixel(self, pixel: int, color: RgbPixel):
         if pixel > 31:
             raise ValueError("Pixel value must be less than 32.")
-        self.pixels[pixel] = color
+        self.rgb[pixel] = (color.red, color.green, color.blue)
 
     def clear_pixels(self):
-        for i in range(len(self.pixels)):
-            self.pixels[i] = RgbPixel(0, 0, 0)
\ No newline at end of file
+        self.rgb[:] = 0
@@ -0,0 +1,167 @@
+"""
+The programmed tracks for the lightbars. Edit the setlist here, the render code does not need to change.
+"""
+import dataclasses
+import math
+import typing
+
+from common_types import RgbPixel, UpdateFrequency, rgb_array
+from cues import Cue, CueList, after, during
+from lightbar.lightbar_modes import (
+    ColorwaveState, ColorWheelState, Mode, NootNootState, OrganizedUpdateOfLightbars, PixelSunstate,
+    RandomUpdateAmountOfLightbars, RetrowaveGridState, TankEngineState, disco_pallette, purple_disco,
+    quarter_orange_wheel,
+)
+from utils import generate_random_color
+
+
+@dataclasses.dataclass(frozen=True)
+class LightbarCue:
+    """
+    What the lightbar designer does while the cue is active.
+    """
+    mode: typing.Optional[Mode] = None
+    """None keeps the current mode."""
+    state: typing.Optional[type] = None
+    """Mode state class. A new state is created when the current one is of another type."""
+    clear_state: bool = False
+    """Drop the mode state."""
+    new_state_every_pulse: bool = False
+    state_on_beat_only: bool = False
+    """Only create the state on a beat, so the effect starts in sync."""
+    clear_lightbars: bool = False
+    """Clear the lightbars whenever a new state is created."""
+    init: typing.Mapping[str, typing.Any] = dataclasses.field(default_factory=dict)
+    """State attributes set when the state is created. Callables are called for the value."""
+    settings: typing.Mapping[str, typing.Any] = dataclasses.field(default_factory=dict)
+    """State attributes set on every pulse while the cue is active."""
+    hold: bool = False
+    """Do not render at all, the lightbars keep what they have."""
+    new_color_after_spawn: bool = False
+    """Retrowave grid: pick a new color once the current one has left the center."""
+
+
+LightbarTrackCues = typing.List[CueList[LightbarCue]]
+"""Layers of cues. The active cue of every layer is applied, in order."""
+
+OFF = LightbarCue(mode=Mode.OFF, clear_state=True)
+
+
+def same_pallette(pallette: typing.List[RgbPixel]) -> typing.Dict[int, typing.List[RgbPixel]]:
+    return {0: pallette, 1: pallette, 2: pallette}
+
+
+def organized_color_change(pallette: typing.Dict[int, typing.List[RgbPixel]],
+                           lightbar_pairings: typing.Optional[typing.List[typing.List[int]]] = None) -> LightbarCue:
+    settings = {"color_pallette": pallette}
+    if lightbar_pairings is not None:
+        settings["lightbar_pairings"] = lightbar_pairings
+    return LightbarCue(mode=Mode.LIGHTBARS_CHANGE_COLOR, state=OrganizedUpdateOfLightbars, settings=settings)
+
+
+RANDOM_COLOR_CHANGE = LightbarCue(mode=Mode.LIGHTBARS_CHANGE_COLOR, state=RandomUpdateAmountOfLightbars, new_state_every_pulse=True)
+RETROWAVE_NEW_COLORS = LightbarCue(mode=Mode.RETROWAVE_GRID, state=RetrowaveGridState, new_color_after_spawn=True)
+THOMAS = LightbarCue(mode=Mode.THOMAS_THE_DANK_ENGINE, state=TankEngineState, new_state_every_pulse=True)
+
+
+def only(cue: LightbarCue) -> LightbarTrackCues:
+    """The same cue for the whole track."""
+    return [CueList(default=cue)]
+
+
+PAIRED_BARS = [[0, 2], [1]]
+junkyard_orange = [RgbPixel(255, 140, 0), RgbPixel(255, 215, 0)]
+keep_moving_gold = [RgbPixel(219, 172, 52), RgbPixel(226, 88, 37)]
+bezos_orange = [RgbPixel(255, 153, 0), RgbPixel(0, 0, 0)]
+
+LIGHTBAR_CUES: typing.Dict[str, LightbarTrackCues] = {
+    "Junkyard Dunebuggy": [CueList(
+        during(LightbarCue(mode=Mode.COLOR_WHEEL, state=ColorWheelState, init={
+            "pixels": lambda: rgb_array(quarter_orange_wheel + list(reversed(quarter_orange_wheel)) + quarter_orange_wheel + list(reversed(quarter_orange_wheel)))
+        }), (29, 48), (77, 95.8)) +
+        during(organized_color_change(same_pallette(junkyard_orange), PAIRED_BARS), (0, 95.8), (172.8, 182.2)) +
+        during(LightbarCue(mode=Mode.PIXEL_SUN, state=PixelSunstate, settings={
+            "purple_sky": False, "beat_shift": True, "fade_in": False}), (95.8, 172.8)) +
+        during(LightbarCue(mode=Mode.PIXEL_SUN, state=PixelSunstate, settings={
+            "purple_sky": True, "beat_shift": True, "fade_in": False}), (182.2, 220)),
+        default=OFF)],
+    "Disco Guy (Original Version)": only(organized_color_change(same_pallette(purple_disco), PAIRED_BARS)),
+    "Skibidi (Romantic Edition)": only(organized_color_change(same_pallette(purple_disco), PAIRED_BARS)),
+    "Don't Leave Me Lonely (feat. YEBBA) [Purple Disco Machine Remix]": only(organized_color_change(same_pallette(disco_pallette), PAIRED_BARS)),
+    "Disco Inferno": only(organized_color_change(same_pallette(disco_pallette), PAIRED_BARS)),
+    "Cha Cha Cha": only(organized_color_change(same_pallette([RgbPixel(255, 20, 147), RgbPixel(0, 255, 0)]), PAIRED_BARS)),
+    "Voodoo? (Lazywax Remix)": only(organized_color_change(same_pallette(disco_pallette), PAIRED_BARS)),
+    "City Boy": only(RANDOM_COLOR_CHANGE),
+    "They're Taking The Hobbits To Isengard": only(RANDOM_COLOR_CHANGE),
+    "Bezos I": [
+        CueList([after(42, RANDOM_COLOR_CHANGE)], default=organized_color_change(same_pallette(bezos_orange), PAIRED_BARS)),
+        CueList(
+            during(LightbarCue(settings={"update_frequency": UpdateFrequency.HALF_BEAT}), (7.2, 7.9), (15.5, 16.3), (24.1, 24.9)) +
+            during(LightbarCue(hold=True), (7.9, 8.3), (16.4, 16.7), (25, 25.3)) +
+            [Cue(-math.inf, 42, LightbarCue(settings={"update_frequency": UpdateFrequency.BEAT}), end_inclusive=True)]),
+    ],
+    "Keep Moving": [CueList(
+        during(LightbarCue(mode=Mode.COLOR_WAVE, state=ColorwaveState, init={
+            "colour_pallette": keep_moving_gold, "beat_interval": 2}), (132.2, 149.4)) +
+        [after(28.5, organized_color_change(same_pallette(keep_moving_gold), PAIRED_BARS))],
+        default=OFF)],
+    "Paris (Aeroplane Remix)": [CueList([
+        Cue(0, 34.5, LightbarCue(mode=Mode.RETROWAVE_GRID, state=RetrowaveGridState, init={
+            "colour_pallette": lambda: [generate_random_color(), generate_random_color()], "beat_interval": 2}),
+            end_inclusive=True),
+        after(34.5, LightbarCue(mode=Mode.COLOR_WAVE, state=ColorwaveState, init={
+            "colour_pallette": lambda: [generate_random_color(), generate_random_color()], "beat_interval": 1})),
+    ], default=OFF)],
+    "Hot": only(RANDOM_COLOR_CHANGE),
+    "We Don't Need Another Hero (Thunderdome)": [CueList(
+        during(organized_color_change({
+            0: [RgbPixel(255, 0, 0), RgbPixel(150, 0, 0)],
+            1: [RgbPixel(0, 255, 0), RgbPixel(0, 150, 0)],
+            2: [RgbPixel(255, 0, 0), RgbPixel(150, 0, 0)],
+        }, PAIRED_BARS), (0, 73.8), (92.5, 149), (204, 238)) +
+        during(organized_color_change({
+            0: [RgbPixel(50, 205, 50), RgbPixel(0, 255, 0)],  # limegreens
+            1: [RgbPixel(135, 206, 235), RgbPixel(30, 144, 255)],  # skyblues
+            2: [RgbPixel(50, 205, 50), RgbPixel(0, 255, 0)],  # limegreens
+        }), (73.8, 92.5), (149, 182)) +
+        during(LightbarCue(mode=Mode.PIXEL_SUN, state=PixelSunstate, settings={
+            "purple_sky": False, "beat_shift": True, "fade_in": False}), (185.3, 204)),
+        default=LightbarCue(mode=Mode.OFF))],
+    "Lost Woods": only(LightbarCue(mode=Mode.COLOR_WHEEL, state=ColorWheelState)),
+    "Biggie smalls the tank engine": [CueList([after(20.8, THOMAS)], default=OFF)],
+    "Hard to Be Funky (feat. Lou Hayter)": only(RETROWAVE_NEW_COLORS),
+    "Noot noot the police": [CueList(
+        [after(1.9, LightbarCue(mode=Mode.NOOT_NOOT, state=NootNootState, state_on_beat_only=True))], default=OFF)],
+    "Milestones": [
+        CueList(default=LightbarCue(mode=Mode.COLOR_WAVE, state=ColorwaveState)),
+        CueList([after(69.7, LightbarCue(settings={"beat_interval": 1}))], default=LightbarCue(settings={"beat_interval": 2})),
+    ],
+    "10 Years (Chromeo Remix)": only(LightbarCue(mode=Mode.COLOR_WAVE, state=ColorwaveState, settings={
+        "colour_pallette": [RgbPixel(34, 139, 34), RgbPixel(0, 255, 0)]})),
+    "The Girl and the Robot": [CueList(
+        [after(222, OFF)], default=LightbarCue(mode=Mode.RETROWAVE_GRID, state=RetrowaveGridState))],
+    "Make Me Thomas (feat. Jawn Legend)": only(THOMAS),
+    "Santa Catarina": only(organized_color_change(same_pallette(disco_pallette))),
+    "Rasputin": only(organized_color_change(same_pallette(disco_pallette))),
+    "Crescendolls": only(RETROWAVE_NEW_COLORS),
+    "Time Machine": only(RETROWAVE_NEW_COLORS),
+    "Jeg Vil Bare Danse": [
+        CueList(default=LightbarCue(mode=Mode.COLOR_WAVE, state=ColorwaveState, settings={"colour_pallette": disco_pallette})),
+        CueList(during(LightbarCue(settings={"beat_interval": 1}), (52.4, 84.5), (134.5, 167)),
+                default=LightbarCue(settings={"beat_interval": 2})),
+    ],
+    "Amberina Sun": [
+        CueList(default=LightbarCue(mode=Mode.PIXEL_SUN, state=PixelSunstate, clear_lightbars=True)),
+        CueList(during(LightbarCue(settings={"purple_sky": True}), (146.0, 249.5)),
+                default=LightbarCue(settings={"purple_sky": False})),
+        CueList(
+            during(LightbarCue(settings={"fade_in": True}), (0, 41.5)) +
+            [after(41.5, LightbarCue(settings={"fade_in": False, "fade_in_counter": 0, "beat_shift": True}))],
+            default=LightbarCue(settings={"fade_in_counter": 0, "fade_in": False})),
+    ],
+    "Mopedbart": [
+        CueList(default=LightbarCue(mode=Mode.PIXEL_SUN, state=PixelSunstate, clear_lightbars=True, settings={"purple_sky": True})),
+        CueList(during(LightbarCue(settings={"fade_in": True}), (0, 36)),
+                default=LightbarCue(settings={"fade_in": False, "fade_in_counter": 0, "beat_shift": True})),
+    ],
+}
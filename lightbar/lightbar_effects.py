@@ -0,0 +1,63 @@
+"""
+Strip effects that are a function of the MIDI clock position, instead of a buffer stepped once per pulse.
+
+Every effect renders the (96, 3) strip for a pulse position, the fractional number of pulses since the effect
+started. The output loop samples them once per output frame at the position the clock is at, whatever the frame rate
+and tempo: between two pulses the strip is blended from both, so slow tracks move smoothly instead of in pulse steps.
+"""
+import math
+import typing
+
+import numpy
+
+from common_types import RgbPixel
+
+STRIP_SIZE = 96
+HALF_STRIP = STRIP_SIZE // 2
+
+CENTER_DISTANCE = numpy.concatenate([numpy.arange(HALF_STRIP - 1, -1, -1), numpy.arange(HALF_STRIP)])
+"""Distance of every pixel from the two center pixels (47 and 48)."""
+
+
+def sample_pulses(pixels_at: typing.Callable[[int], numpy.ndarray], pulses: float, out: numpy.ndarray) -> None:
+    """
+    Renders an effect defined on whole pulses at a fractional pulse position, blending the pulses on either side.
+    """
+    pulse = math.floor(pulses)
+    fraction = pulses - pulse
+    current = pixels_at(pulse)
+    if fraction == 0:
+        out[:] = current
+        return
+    following = pixels_at(pulse + 1)
+    out[:] = numpy.rint(current * (1 - fraction) + following * fraction)
+
+
+def color_wheel(pixels: numpy.ndarray, pulses: float, out: numpy.ndarray) -> None:
+    """
+    The left half of the strip rotates left and the right half rotates right, one pixel per pulse.
+    pixels is the wheel at pulse 0.
+    """
+    def wheel_at(pulse: int) -> numpy.ndarray:
+        left = (numpy.arange(HALF_STRIP) + pulse) % HALF_STRIP
+        right = (numpy.arange(HALF_STRIP) - pulse) % HALF_STRIP + HALF_STRIP
+        return pixels[numpy.concatenate([left, right])]
+
+    sample_pulses(wheel_at, pulses, out)
+
+
+def color_wave(spawns: typing.Sequence[typing.Tuple[int, RgbPixel]], pulses: float, out: numpy.ndarray) -> None:
+    """
+    Colors spawn on the center pixels and travel outwards, one pixel per pulse.
+    spawns are the pulses colors spawned at and the colors, oldest first. Pixels no spawn reached yet are off.
+    """
+    spawn_pulses = numpy.array([pulse for pulse, _ in spawns], dtype=numpy.int64)
+    colors = numpy.zeros((len(spawns) + 1, 3), dtype=numpy.uint8)
+    for i, (_, color) in enumerate(spawns):
+        colors[i + 1] = (color.red, color.green, color.blue)
+
+    def wave_at(pulse: int) -> numpy.ndarray:
+        # A pixel shows the newest color that spawned at least its distance from the center ago.
+        return colors[numpy.searchsorted(spawn_pulses, pulse - CENTER_DISTANCE, side="right")]
+
+    sample_pulses(wave_at, pulses, out)
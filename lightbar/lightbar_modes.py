@@ -0,0 +1,321 @@
+import copy
+import dataclasses
+import enum
+import typing
+from collections import deque
+
+import numpy
+
+from common_types import UpdateFrequency, RgbPixel, rgb_array
+from utils import generate_random_color
+
+purple_disco = [RgbPixel(123, 29, 175), RgbPixel(255, 47, 185)]
+
+
+@dataclasses.dataclass
+class RandomUpdateAmountOfLightbars:
+    update_frequency: UpdateFrequency = UpdateFrequency.BEAT
+    amount_of_lightbars: int = 3
+
+@dataclasses.dataclass
+class OrganizedUpdateOfLightbars:
+    lightbar_pairings: typing.List[typing.List[int]] = dataclasses.field(default_factory=lambda: [[0],[1],[2]])
+    color_pallette: typing.Optional[typing.Dict[int, typing.List[RgbPixel]]] = None
+    update_frequency: UpdateFrequency = UpdateFrequency.BEAT
+    counter = 0
+
+ColorChangeLightBar = typing.Union[RandomUpdateAmountOfLightbars, OrganizedUpdateOfLightbars]
+"""
+Either specify a random number of bars to change, or specify pairings to change sequentially.
+"""
+class Direction(enum.Enum):
+    RIGHT = 1
+    LEFT = 2
+
+@dataclasses.dataclass
+class RandomColorChangesLightBar:
+    update_frequency: UpdateFrequency = UpdateFrequency.BEAT
+    lightbar_color: typing.List[RgbPixel] = dataclasses.field(
+        default_factory=lambda: [generate_random_color() for i in range(3)])
+    bar_update_type: ColorChangeLightBar = OrganizedUpdateOfLightbars()
+    counter = 0
+
+@dataclasses.dataclass
+class RetrowaveGridState:
+    update_frequency: UpdateFrequency = UpdateFrequency.BEAT
+    color: RgbPixel = RgbPixel(255, 0, 255)  # Purple
+    pixels: numpy.ndarray = dataclasses.field(default_factory=lambda: numpy.zeros((96, 3), dtype=numpy.uint8))
+
+@dataclasses.dataclass
+class NootNootState:
+    pulse_counter = 0
+
+
+sky = [
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(0, 191, 255),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 235),
+    RgbPixel(135, 206, 250),
+    RgbPixel(135, 206, 250),
+    RgbPixel(135, 206, 250),
+    RgbPixel(135, 206, 250),
+    RgbPixel(135, 206, 250),
+    RgbPixel(135, 206, 250),
+    RgbPixel(173, 216, 230),
+    RgbPixel(173, 216, 230),
+    RgbPixel(173, 216, 230),
+    RgbPixel(173, 216, 230),
+    RgbPixel(173, 216, 230),
+    RgbPixel(173, 216, 230),
+    RgbPixel(176, 224, 230),
+    RgbPixel(176, 224, 230),
+    RgbPixel(176, 224, 230),
+    RgbPixel(176, 224, 230),
+]
+
+purple_sky = [
+    RgbPixel(148,0,211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(255,0,255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(255, 0, 255),
+    RgbPixel(238,130,238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(238, 130, 238),
+]
+
+half_sun = [
+    RgbPixel(255,140,0),
+    RgbPixel(255,140,0),
+    RgbPixel(255,140,0),
+    RgbPixel(255,140,0),
+    RgbPixel(255,140,0),
+    RgbPixel(255,140,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,165,0),
+    RgbPixel(255,255,102),
+    RgbPixel(255,255,102),
+    RgbPixel(255, 255, 0),
+    RgbPixel(255, 255, 0)
+]
+
+quarter_purple_wheel = [
+    RgbPixel(75,0,130),
+    RgbPixel(128, 0, 128),
+    RgbPixel(139,0,139),
+    RgbPixel(139, 0, 139),
+    RgbPixel(153,50,204),
+    RgbPixel(153, 50, 204),
+    RgbPixel(148,0,211),
+    RgbPixel(148, 0, 211),
+    RgbPixel(138,43,226),
+    RgbPixel(138, 43, 226),
+    RgbPixel(147,112,219),
+    RgbPixel(147, 112, 219),
+    RgbPixel(186,85,211),
+    RgbPixel(186, 85, 211),
+    RgbPixel(218,112,214),
+    RgbPixel(218, 112, 214),
+    RgbPixel(238,130,238),
+    RgbPixel(238, 130, 238),
+    RgbPixel(221,160,221),
+    RgbPixel(221, 160, 221),
+    RgbPixel(216,191,216),
+    RgbPixel(216, 191, 216),
+    RgbPixel(230,230,250),
+    RgbPixel(230, 230, 250),
+]
+
+quarter_orange_wheel = [
+    RgbPixel(255,127,66),
+    RgbPixel(255,130,66),
+    RgbPixel(255,134,66),
+    RgbPixel(255,138,66),
+    RgbPixel(255,143,66),
+    RgbPixel(255,147,66),
+    RgbPixel(255,150,66),
+    RgbPixel(255,154,66),
+    RgbPixel(255,158,66),
+    RgbPixel(255,162,66),
+    RgbPixel(255,166,66),
+    RgbPixel(255,170,66),
+    RgbPixel(255,174,66),
+    RgbPixel(255,178,66),
+    RgbPixel(255,182,66),
+    RgbPixel(255,186,66),
+    RgbPixel(255,190,66),
+    RgbPixel(255,194,66),
+    RgbPixel(255,198,66),
+    RgbPixel(255,202,66),
+    RgbPixel(255,221,66),
+    RgbPixel(255,225,66),
+    RgbPixel(255,229,66),
+    RgbPixel(255,233,66),
+]
+
+@dataclasses.dataclass
+class PixelSunstate:
+    fade_in = True
+    fade_in_counter = 0
+    beat_shift = False
+    beat_shift_counter = 0  # The counter == offset from centered position. max [-8, +8]
+    beat_shift_direction = Direction.RIGHT
+    purple_sky = False
+    pixels: deque[RgbPixel] = deque(sky + half_sun + list(reversed(copy.deepcopy(half_sun))) + list(reversed(copy.deepcopy(sky))))
+
+@dataclasses.dataclass
+class TankEngineState:
+    update_frequency: UpdateFrequency = UpdateFrequency.BEAT
+    counter = 0
+    """Draw thomas the tank engine."""
+    pixels: deque[RgbPixel] = deque([
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(107, 107, 107),
+                                    ] + [RgbPixel(0, 0, 0) for _ in range(35)] +
+                                    [
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(128, 68, 28),
+                                        RgbPixel(10, 10, 10),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(25, 25, 255),
+                                        RgbPixel(107, 107, 107),
+                                    ]
+
+                                    + [RgbPixel(0, 0, 0) for _ in range(36)])
+
+@dataclasses.dataclass
+class BeatSquareBounceState:
+    color: RgbPixel = RgbPixel(255, 0, 0)
+    width: typing.Final[int] = 4
+    pulse_velocity: int = 4
+    direction: Direction = Direction.RIGHT
+    pixels: numpy.ndarray = dataclasses.field(default_factory=lambda: numpy.zeros((96, 3), dtype=numpy.uint8))
+    beat_synced = False
+
+@dataclasses.dataclass
+class ColorwaveState:
+    beat_interval = 1
+    previous_color: RgbPixel = RgbPixel(0, 0, 0)
+    colour_pallette: list[RgbPixel] = dataclasses.field(default_factory=lambda: [RgbPixel(255, 0, 0), RgbPixel(0, 255, 0), RgbPixel(0, 0, 255)])
+    spawns: typing.Deque[typing.Tuple[int, RgbPixel]] = dataclasses.field(default_factory=lambda: deque(maxlen=4))
+    """Pulses the colors spawned at, and the colors. Four spawns are more than the strip shows at once."""
+
+class Mode(enum.Enum):
+    DRAW_TOWARDS_RIGHT = 1
+    RAINBOW_BLINK = 2
+    BLINK = 3
+    BEAT_SQUARE = 4
+    BEAT_SQUARE_BOUNCING = 5
+    LIGHTBARS_CHANGE_COLOR = 6
+    THOMAS_THE_DANK_ENGINE = 7
+    RETROWAVE_GRID = 8
+    OFF = 9
+    NOOT_NOOT = 10
+    PIXEL_SUN = 11
+    COLOR_WHEEL = 12
+    COLOR_WAVE = 13
+
+disco_pallette = [
+    RgbPixel(15, 192, 252),
+    RgbPixel(123, 29, 175),
+    RgbPixel(255, 47, 185),
+    RgbPixel(212, 255, 71),
+    RgbPixel(27, 54, 73),
+]
+
+@dataclasses.dataclass
+class ColorWheelState:
+    """
+    Divide the strip in two. Each strip has two mirrored color ranges that are identical but mirrored.
+    Rotate both halves evenly to get a cool effect!
+    """
+    pixels: numpy.ndarray = dataclasses.field(default_factory=lambda: rgb_array(quarter_purple_wheel + list(reversed(quarter_purple_wheel)) + quarter_purple_wheel + list(reversed(quarter_purple_wheel))))
+    start: typing.Optional[int] = None
+    """Pulse the wheel started turning at, set when it is first rendered."""
+
+class UpdateType(enum.Enum):
+    PULSE = 1
+    BEAT = 2
@@ -1,69 +1,81 @@
 from __future__ import print_function
 
-import json
 import os
-import threading
-import time
 import pygame
 from rtmidi.midiutil import open_midiinput
-import DMXEnttecPro.src.DMXEnttecPro.controller as dmx_driver
+from dmx.network import ArtNetSender, SacnSender
+from dmx.output_worker import DmxOutputWorker
+from dmx.patch import load_patch
+from dmx.personalities import PERSONALITIES
 from dragon.dragon_designer import DragonDesigner
+from dragon.smoke_control import SmokePolicy
 from lightbar.lightbar_designer import LightbarDesigner
 from midi.midi_input_handler import MidiInputHandler
-from stage.dmx_adapter import map_stage_to_dmx
-from stage.pygame_adapter import map_stage_to_pygame
-from stage.stage import create_stage
+from profiling import PROFILER
+from show_file import ShowFileWatcher
+from show_recorder import ShowRecorder
+from simple_webserver import MetadataServer
+from stage.dmx_adapter import compile_stage_patch, map_stage_to_dmx, stage_2023_patch
+from stage.frame_scheduler import FrameScheduler
+from stage.pygame_adapter import map_stage_to_pygame, profile_to_pygame
+from stage.render_stage import RenderStage
+from stage.stage import create_stage, StageChangeTracker
+from stage.timed_actions import TimedActions
 from traktor_metadata import TraktorMetadata
 
 import sys
 
-from flask import Flask, request, jsonify
-import logging
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)
-app = Flask(__name__)
-
 traktor_metadata = TraktorMetadata()
 
 simulation = os.getenv("SIMULATION", None)
-
-@app.route('/deckLoaded/<deck>', methods=['POST', 'GET'])
-def deckLoaded(deck):
-   if request.method == 'POST':
-      if deck == "1":
-         traktor_metadata.current_track_deck_a = json.loads(request.data)["value"]
-         traktor_metadata.current_track_elapsed_deck_a = json.loads(request.data)["elapsed"]
-      elif deck == "2":
-            traktor_metadata.current_track_deck_b = json.loads(request.data)["value"]
-            traktor_metadata.current_track_elapsed_deck_b = json.loads(request.data)["elapsed"]
-      return jsonify(success=True)
-   else:
-      return jsonify(success=True)
-
-@app.route('/updateMasterClock', methods=['POST', 'GET'])
-def updateMasterClock():
-    if request.method == 'POST':
-        traktor_metadata.master_deck = json.loads(request.data)["deck"]
-        traktor_metadata.master_deck_change_handled = False
-        print(json.loads(request.data))
-        return jsonify(success=True)
-    else:
-        return jsonify(success=True)
-
-if simulation is None:
-    ctrl = dmx_driver.Controller(
+output_rate = float(os.getenv("OUTPUT_RATE", 44))  # 44Hz is the "standard" framerate for DMX
+show_file = os.getenv("SHOW_FILE", None)  # Cues to play on top of the built-in ones, reloaded when the file changes.
+# Latency compensation, in milliseconds. MIDI_LATENCY is how late the MIDI clock pulses reach us after the beat,
+# DMX_LATENCY and DISPLAY_LATENCY how long it takes from handing a frame to the output until the light changes.
+# The designers render ahead by the largest output latency, each output shows the frame meant for its own.
+midi_latency = float(os.getenv("MIDI_LATENCY", 0)) / 1000
+dmx_latency = float(os.getenv("DMX_LATENCY", 0)) / 1000
+display_latency = float(os.getenv("DISPLAY_LATENCY", 0)) / 1000
+# Smoke machine limits in seconds: how long a machine stays off before smoking again, and smokes at most in one go.
+smoke_policy = SmokePolicy(min_off=float(os.getenv("SMOKE_MIN_OFF", 0.4)), max_on=float(os.getenv("SMOKE_MAX_ON", 30)))
+# Profiling of the hot path stages is on unless PROFILE=0. PROFILE_OVERLAY=1 shows it in the window,
+# PROFILE_DUMP writes it to that JSON file on exit.
+PROFILER.enabled = os.getenv("PROFILE", "1") != "0"
+profile_overlay = os.getenv("PROFILE_OVERLAY", "0") == "1"
+profile_dump = os.getenv("PROFILE_DUMP", None)
+# DMX output: "enttec" (the USB adapter), "artnet" or "sacn". DMX_HOST is the Art-Net node (broadcast without one),
+# or the sACN receiver (multicast without one). DMX_UNIVERSE is the universe the 2023 rig is patched to.
+# DMX_PATCH is a JSON patch file to use instead of the 2023 rig (see dmx/patch.py), the Enttec adapter only sends
+# the lowest universe of it.
+dmx_output_type = os.getenv("DMX_OUTPUT", "enttec")
+dmx_host = os.getenv("DMX_HOST", None)
+dmx_universe_number = int(os.getenv("DMX_UNIVERSE", 0 if dmx_output_type == "artnet" else 1))
+dmx_patch_file = os.getenv("DMX_PATCH", None)
+dmx_patch = compile_stage_patch(load_patch(dmx_patch_file, PERSONALITIES) if dmx_patch_file is not None
+                                else stage_2023_patch(dmx_universe_number))
+# SHOW_RECORDING records the MIDI, the Traktor metadata and the DMX frames of the set to that file, to look into
+# afterwards with show_recorder.read_show.
+show_recording = os.getenv("SHOW_RECORDING", None)
+show_recorder = ShowRecorder(show_recording) if show_recording is not None else None
+
+
+def open_dmx_controller():
+    if dmx_output_type == "artnet":
+        return ArtNetSender(dmx_host or "255.255.255.255", universe=dmx_universe_number)
+    if dmx_output_type == "sacn":
+        return SacnSender(dmx_host, universe=dmx_universe_number)
+    # Only needed for the USB adapter.
+    import DMXEnttecPro.src.DMXEnttecPro.controller as dmx_driver
+    return dmx_driver.Controller(
         port_string="/dev/cu.usbserial-EN379589",
         dmx_size=512,
         baudrate=250000,
         timeout=1,
         auto_submit=False,
     )
-else:
-    ctrl = None
 
-@app.route('/success/<name>')
-def success(name):
-   return 'welcome %s' % name
+
+ctrl = open_dmx_controller() if simulation is None else None
 
 def main():
 
@@ -77,45 +89,86 @@ def main():
     except (EOFError, KeyboardInterrupt):
         sys.exit()
 
-    print("Attaching MIDI input callback handler.")
     midi_input_handler = MidiInputHandler(port_name)
-    midiin.set_callback(midi_input_handler)
+    midi_input_handler.recorder = show_recorder
 
     print("Initializing stage")
     pygame.init()
     surface = pygame.display.set_mode((1190, 300))
 
+    show_watcher = ShowFileWatcher(show_file) if show_file is not None else None
+    show = show_watcher.show if show_watcher is not None else None
+
     stage = create_stage(traktor_metadata)
-    lightbar_designer = LightbarDesigner(midi_input_handler, stage.lightbar_one, stage.lightbar_three, stage.lightbar_two, traktor_metadata)
-    dragon_designer = DragonDesigner(midi_input_handler, stage)
+    lightbar_designer = LightbarDesigner(midi_input_handler, stage.lightbar_one, stage.lightbar_three, stage.lightbar_two, traktor_metadata, stage.lightbar_strip, show)
+    timed_actions = TimedActions(midi_input_handler.clock)
+    dragon_designer = DragonDesigner(midi_input_handler, stage, show, timed_actions, smoke_policy)
+    if show_watcher is not None:
+        show_watcher.notify_on_reload(lightbar_designer.set_show)
+        show_watcher.notify_on_reload(dragon_designer.set_show)
+        show_watcher.start()
+    # Serial writes happen on their own thread, a stalling USB link only delays the DMX frames.
+    dmx_output = DmxOutputWorker(ctrl) if ctrl is not None else None
+    if dmx_output is not None:
+        dmx_output.start()
+    dmx_change_tracker = StageChangeTracker()
+    pygame_change_tracker = StageChangeTracker()
+
+    render_ahead = max(dmx_latency, display_latency)
+    if midi_latency or render_ahead:
+        midi_input_handler.lookahead = midi_latency + render_ahead
+        traktor_metadata.lookahead = render_ahead
+
+    print("Attaching MIDI input callback handler.")
+    render_stage = RenderStage(midi_input_handler, stage, render_ahead, frame_rate=output_rate, timed_actions=timed_actions)
+    render_stage.start()
+    midiin.set_callback(render_stage)
+    frame_scheduler = FrameScheduler(rate_hz=output_rate)
     print("Entering main loop. Press Control-C to exit.")
     try:
         while True:
-            # Refresh at 44Hz (the "standard" framerate for DMX)
-            map_stage_to_pygame(stage, surface)
-
-            if ctrl is not None:
-                map_stage_to_dmx(stage, ctrl)
-            time.sleep(1 / 44)
+            frame_scheduler.wait()
+            now = midi_input_handler.clock()
+            map_stage_to_pygame(render_stage.frame_for(now + display_latency), surface, pygame_change_tracker)
+            if profile_overlay and frame_scheduler.frames % int(output_rate // 4 or 1) == 0:
+                # A few times per second is enough to read, and keeps the text rendering off most frames.
+                pygame.display.update(profile_to_pygame(PROFILER, surface))
+
+            if dmx_output is not None:
+                submitted = map_stage_to_dmx(render_stage.frame_for(now + dmx_latency), dmx_output, dmx_patch,
+                                             dmx_change_tracker)
+                if submitted and show_recorder is not None:
+                    for number, universe in dmx_patch.universes.items():
+                        show_recorder.dmx(number, universe.data)
 
     except KeyboardInterrupt:
         print('')
     finally:
+        print("Output frames: {}".format(frame_scheduler.stats()))
+        if dmx_output is not None:
+            dmx_output.stop()
+            print("DMX output: {}".format(dmx_output.stats()))
+        if show_recorder is not None:
+            show_recorder.stop()
+            print("Show recording: {}".format(show_recorder.stats()))
+        for subscriber, timings in midi_input_handler.callback_stats().items():
+            print("{}: {}".format(subscriber, timings))
+        if profile_dump is not None:
+            PROFILER.dump(profile_dump, extra={
+                "output_frames": frame_scheduler.stats(),
+                "dmx_output": dmx_output.stats() if dmx_output is not None else None,
+                "callbacks": midi_input_handler.callback_stats(),
+            })
+            print("Profile written to {}".format(profile_dump))
         print("Exit.")
         midiin.close_port()
         del midiin
+        render_stage.stop()
+        if show_watcher is not None:
+            show_watcher.stop()
 
 
 
-# Channel 1-96 (96ch, 3ch per pixel): Lightbar left
-# Channel 97-192 (96ch, 3ch per pixel): Lightbar Center
-# Channel 193-288 (96ch, 3ch per pixel): Lightbar Right
-# Channel 289-295 (7ch, ch 1 = master dimmer?, ch2,3,4 = RGB?): Dragon left eye left
-# Channel 296-302(7ch): Dragon left eye right
-# Channel 303-308 (6ch, ch1 smoke emit, ch2 hardcode 0 for color select, ch3-5 is RGB): Dragon left smoke
-# Channel 309-315(7ch): Dragon right eye left
-# Channel 316-322 (7ch): Dragon right eye right
-# Channel 323-328 (6ch, ch1 smoke emit, ch2 hardcode 0 for color select, ch3-5 is RGB): Dragon right smoke
 if __name__ == "__main__":
     # print("Clearing channels!")
     # for i in range(1, 513):
@@ -183,6 +236,8 @@ if __name__ == "__main__":
 
 
 
-    threading.Thread(target=lambda: app.run(debug=False, use_reloader=False)).start()
+    if show_recorder is not None:
+        show_recorder.start()
+    MetadataServer(traktor_metadata, recorder=show_recorder).start()
     main()
 
@@ -0,0 +1,108 @@
+from __future__ import print_function
+
+import bisect
+import logging
+import time
+import typing
+
+log = logging.getLogger('midiin_callback')
+
+
+class SubscriberTimings:
+    """
+    Latency histogram of one subscriber, in one context (say a designer in one mode on one track).
+    """
+    BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50)
+    """Upper bounds of the histogram buckets in milliseconds. The last bucket counts everything slower."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.overruns = 0
+        """Calls that took longer than a pulse interval."""
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def add(self, took: float, overrun: bool):
+        self.calls += 1
+        self.total += took
+        if took > self.max:
+            self.max = took
+        if overrun:
+            self.overruns += 1
+        self.histogram[bisect.bisect_left(self.BUCKETS_MS, took * 1000)] += 1
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "calls": self.calls,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / self.calls if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "overruns": self.overruns,
+            "histogram": dict(zip(["<={}ms".format(bound) for bound in self.BUCKETS_MS] + [">{}ms".format(self.BUCKETS_MS[-1])],
+                                  self.histogram)),
+        }
+
+
+class CallbackTimer:
+    """
+    Calls the MidiInputHandler's subscribers and times every call.
+
+    Timings are kept per subscriber and per context: a subscriber can register a describe function, called after
+    every call, that tells what it was doing (for the designers the track and the mode). A call that takes longer
+    than the budget, the pulse interval at the current tempo, overran: the next clock pulse was already due.
+    The first overrun of every subscriber and context is logged, all of them are counted.
+
+    Called on the thread dispatching the callbacks. stats() can be read from any thread, the numbers are a moment
+    apart at worst.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.names: typing.Dict[typing.Callable, str] = {}
+        self.describers: typing.Dict[typing.Callable, typing.Callable[[], typing.Hashable]] = {}
+        self.timings: typing.Dict[typing.Tuple[str, typing.Hashable], SubscriberTimings] = {}
+        self.overruns = 0
+
+    def subscribe(self, callback: typing.Callable, describe: typing.Optional[typing.Callable[[], typing.Hashable]] = None):
+        self.names[callback] = getattr(callback, "__qualname__", repr(callback))
+        if describe is not None:
+            self.describers[callback] = describe
+
+    def call(self, callback: typing.Callable, budget: float, *args):
+        """
+        Calls callback(*args), timing it against budget seconds (0 for no budget).
+        """
+        started = self.clock()
+        callback(*args)
+        took = self.clock() - started
+
+        describe = self.describers.get(callback)
+        key = (self.names.get(callback) or getattr(callback, "__qualname__", repr(callback)),
+               describe() if describe is not None else None)
+        timings = self.timings.get(key)
+        if timings is None:
+            timings = self.timings[key] = SubscriberTimings()
+        overrun = 0 < budget < took
+        if overrun:
+            self.overruns += 1
+            if not timings.overruns:
+                log.warning("%s took %.1fms during %s, longer than a pulse (%.1fms)",
+                            key[0], took * 1000, format_context(key[1]), budget * 1000)
+        timings.add(took, overrun)
+
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Timings per subscriber and context, the ones that took the most time in total first.
+        """
+        timings = sorted(self.timings.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            name if context is None else "{} [{}]".format(name, format_context(context)): subscriber.stats()
+            for (name, context), subscriber in timings
+        }
+
+
+def format_context(context: typing.Hashable) -> str:
+    if isinstance(context, tuple):
+        return " / ".join(str(part) for part in context)
+    return str(context)
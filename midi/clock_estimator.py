@@ -0,0 +1,130 @@
+from __future__ import print_function
+
+import collections
+import math
+import typing
+
+PULSES_PER_QUARTER_NOTE = 24
+
+
+class MidiClockEstimator:
+    """
+    Recovers a steady tempo and beat phase from jittery MIDI clock pulses.
+
+    A least squares line is fitted through the timestamps of the last pulses (pulse number against time), so the
+    jitter of single pulses averages out. When pulses keep landing off the line, the tempo changed and the fit starts
+    over from the latest pulses.
+
+    Pulse timestamps come from the MIDI driver (rtmidi's delta times), which are more precise than the time the
+    callback runs. To answer queries in the caller's clock, the offset between both clocks is the smallest one seen in
+    the window: the pulse that arrived with the least delay.
+    """
+
+    def __init__(self, window: int = 96, outlier_fraction: float = 0.5, outliers_before_reset: int = 3):
+        self.window = window
+        """Pulses fitted, 96 is four beats."""
+        self.outlier_fraction = outlier_fraction
+        """A pulse further off the fit than this fraction of a pulse interval is an outlier."""
+        self.outliers_before_reset = outliers_before_reset
+        self.pulses: typing.Deque[typing.Tuple[int, float, float]] = collections.deque(maxlen=window)
+        """Pulse number, driver time and caller time of the recent pulses."""
+        self.outliers = 0
+        self.fit: typing.Optional[typing.Tuple[float, float, int, float]] = None
+        """Seconds per pulse, driver time of the first fitted pulse on the fitted line, its pulse number and the clock
+        offset. One tuple, so readers on other threads never see half an update."""
+
+    def reset(self):
+        self.pulses.clear()
+        self.outliers = 0
+        self.fit = None
+
+    def pulse(self, pulse_number: int, driver_time: float, now: float):
+        """
+        Adds a pulse. driver_time is when the driver received it, now is the caller's clock.
+        """
+        if self.fit is not None:
+            seconds_per_pulse, first_time, first_pulse, _ = self.fit
+            predicted = first_time + (pulse_number - first_pulse) * seconds_per_pulse
+            if abs(driver_time - predicted) > self.outlier_fraction * seconds_per_pulse:
+                self.outliers += 1
+                if self.outliers >= self.outliers_before_reset:
+                    # The tempo changed, only keep the pulses at the new tempo.
+                    recent = list(self.pulses)[-(self.outliers - 1):] if self.outliers > 1 else []
+                    self.pulses.clear()
+                    self.pulses.extend(recent)
+                    self.outliers = 0
+            else:
+                self.outliers = 0
+        self.pulses.append((pulse_number, driver_time, now))
+        self._fit()
+
+    def _fit(self):
+        if len(self.pulses) < 2:
+            return
+        first_pulse, first_time, _ = self.pulses[0]
+        count = len(self.pulses)
+        mean_pulse = sum(number - first_pulse for number, _, _ in self.pulses) / count
+        mean_time = sum(time - first_time for _, time, _ in self.pulses) / count
+        covariance = 0.0
+        variance = 0.0
+        for number, time, _ in self.pulses:
+            pulse_deviation = number - first_pulse - mean_pulse
+            covariance += pulse_deviation * (time - first_time - mean_time)
+            variance += pulse_deviation * pulse_deviation
+        seconds_per_pulse = covariance / variance
+        if seconds_per_pulse <= 0:
+            return
+        intercept = first_time + mean_time - mean_pulse * seconds_per_pulse
+        offset = min(now - time for _, time, now in self.pulses)
+        self.fit = (seconds_per_pulse, intercept, first_pulse, offset)
+
+    @property
+    def bpm(self) -> float:
+        """Smoothed tempo, 0 until there are two pulses."""
+        if self.fit is None:
+            return 0.0
+        return 60 / (self.fit[0] * PULSES_PER_QUARTER_NOTE)
+
+    def pulse_position(self, now: float) -> typing.Optional[float]:
+        """
+        The (fractional) pulse number at the caller's time now.
+        """
+        fit = self.fit
+        if fit is None:
+            return None
+        return self._position(fit, now)
+
+    @staticmethod
+    def _position(fit: typing.Tuple[float, float, int, float], now: float) -> float:
+        seconds_per_pulse, first_time, first_pulse, offset = fit
+        return first_pulse + (now - offset - first_time) / seconds_per_pulse
+
+    def pulse_time(self, pulse_number: int) -> typing.Optional[float]:
+        """
+        When the pulse arrives (or arrived), in the caller's clock.
+        """
+        fit = self.fit
+        if fit is None:
+            return None
+        seconds_per_pulse, first_time, first_pulse, offset = fit
+        return first_time + (pulse_number - first_pulse) * seconds_per_pulse + offset
+
+    def beat_phase(self, now: float) -> typing.Optional[float]:
+        """
+        How far into the current beat now is, from 0 (on the beat) to 1.
+        """
+        position = self.pulse_position(now)
+        if position is None:
+            return None
+        return (position / PULSES_PER_QUARTER_NOTE) % 1.0
+
+    def next_beat_time(self, now: float) -> typing.Optional[float]:
+        """
+        When the next beat lands, in the caller's clock.
+        """
+        fit = self.fit
+        if fit is None:
+            return None
+        seconds_per_pulse, first_time, first_pulse, offset = fit
+        next_beat = (math.floor(self._position(fit, now) / PULSES_PER_QUARTER_NOTE) + 1) * PULSES_PER_QUARTER_NOTE
+        return first_time + (next_beat - first_pulse) * seconds_per_pulse + offset
@@ -1,7 +1,13 @@
 from __future__ import print_function
 
 import logging
+import math
 import time
+import typing
+
+from midi.callback_timing import CallbackTimer
+from midi.clock_estimator import MidiClockEstimator, PULSES_PER_QUARTER_NOTE
+from profiling import profiled
 
 log = logging.getLogger('midiin_callback')
 logging.basicConfig(level=logging.DEBUG)
@@ -15,31 +21,138 @@ class MidiInputHandler(object):
         self.estimated_bpm = 0
         self.on_beat_callbacks = []
         self.on_pulse_callbacks = []
+        self.on_frame_callbacks = []
+        self.clock = time.perf_counter
+        """The clock beat_phase and next_beat_time answer in. The offline simulator replaces it with its synthetic clock."""
+        self.driver_time = 0.0
+        """Sum of the delta times rtmidi reported, the MIDI driver's timeline."""
+        self.clock_estimator = MidiClockEstimator()
+        self.lookahead = 0.0
+        """Latency compensation: fire the pulse callbacks this many seconds before the pulses are predicted to arrive.
+        0 fires them as the pulses arrive."""
+        self.rendered_pulses = 0
+        """Pulses the callbacks fired for. Runs ahead of pulse_counter with a lookahead."""
+        self.callback_timer = CallbackTimer()
+        """Times every callback, see callback_stats."""
+        self.recorder = None
+        """A ShowRecorder every incoming message is recorded to, if set."""
 
     def set_mode(self, mode):
         self.mode = mode
 
-    def notify_on_beat(self, callback):
+    def notify_on_beat(self, callback, describe=None):
+        """
+        describe, if given, returns what the subscriber is doing (say the track and mode), to break down its timings.
+        """
         self.on_beat_callbacks.append(callback)
+        self.callback_timer.subscribe(callback, describe)
 
-    def notify_on_pulse(self, callback):
+    def notify_on_pulse(self, callback, describe=None):
         self.on_pulse_callbacks.append(callback)
+        self.callback_timer.subscribe(callback, describe)
+
+    def notify_on_frame(self, callback, describe=None):
+        """
+        callback(beat_position) is called once per output frame, see render_frame.
+        """
+        self.on_frame_callbacks.append(callback)
+        self.callback_timer.subscribe(callback, describe)
+
+    def callback_stats(self):
+        """
+        Latency histograms and overruns (calls longer than a pulse interval) per subscriber and context.
+        """
+        return self.callback_timer.stats()
+
+    def _dispatch(self, callbacks, *args):
+        budget = 60 / (self.estimated_bpm * PULSES_PER_QUARTER_NOTE) if self.estimated_bpm else 0.0
+        for callback in callbacks:
+            self.callback_timer.call(callback, budget, *args)
+
+    def beat_phase(self) -> float:
+        """
+        How far into the current beat the music is right now, from 0 (on the beat) to 1. Moves smoothly between pulses.
+        """
+        phase = self.clock_estimator.beat_phase(self.clock() + self.lookahead)
+        if phase is None:
+            return (self.rendered_pulses % PULSES_PER_QUARTER_NOTE) / PULSES_PER_QUARTER_NOTE
+        return phase
+
+    def beat_position(self) -> float:
+        """
+        Beats since the MIDI clock started, right now (plus the lookahead). Moves smoothly between pulses, but stays
+        between the last pulse the callbacks fired for and the next one, so it never runs ahead of the pulse callbacks
+        or back before them.
+        """
+        position = self.clock_estimator.pulse_position(self.clock() + self.lookahead)
+        if position is None:
+            position = self.rendered_pulses
+        return min(max(position, self.rendered_pulses), self.rendered_pulses + 1) / PULSES_PER_QUARTER_NOTE
+
+    def render_frame(self):
+        """
+        Calls the frame callbacks with the current beat position. The output side calls it once per frame.
+        """
+        if not self.on_frame_callbacks:
+            return
+        self._dispatch(self.on_frame_callbacks, self.beat_position())
 
+    def next_beat_time(self):
+        """
+        When the next beat is expected, in self.clock's time. None until the tempo is known.
+        """
+        return self.clock_estimator.next_beat_time(self.clock())
+
+    def advance(self) -> typing.Optional[float]:
+        """
+        With a lookahead, fires the callbacks of the pulses predicted within the lookahead.
+        Returns when the next pulse is due in self.clock's time, None when there is no prediction to wait for.
+
+        Every pulse fires exactly once and in order. The callbacks never fall behind the pulses that arrived, and
+        when the clock stops they stop after the lookahead's worth of pulses.
+        """
+        if self.lookahead == 0:
+            return None
+        position = self.clock_estimator.pulse_position(self.clock() + self.lookahead)
+        if position is None:
+            target = self.pulse_counter
+            max_ahead = 0
+        else:
+            target = math.floor(position)
+            max_ahead = math.ceil(self.lookahead * self.clock_estimator.bpm * PULSES_PER_QUARTER_NOTE / 60) + 1
+        target = min(max(target, self.pulse_counter), self.pulse_counter + max_ahead)
+        while self.rendered_pulses < target:
+            self.rendered_pulses += 1
+            self._dispatch(self.on_pulse_callbacks)
+            if self.rendered_pulses % PULSES_PER_QUARTER_NOTE == 0:
+                self.beat_number += 1
+                self._dispatch(self.on_beat_callbacks)
+        if self.rendered_pulses >= self.pulse_counter + max_ahead:
+            return None
+        return self.clock_estimator.pulse_time(self.rendered_pulses + 1) - self.lookahead
+
+    @profiled("midi callback")
     def __call__(self, event, data=None):
         message, deltatime = event
+        if self.recorder is not None:
+            self.recorder.midi(message, deltatime)
         if message == [248]:
             self.pulse_counter += 1
-            for callback in self.on_pulse_callbacks:
-                callback()
+            self.driver_time += deltatime
+            self.clock_estimator.pulse(self.pulse_counter, self.driver_time, self.clock())
+            if self.lookahead != 0:
+                self.estimated_bpm = self.clock_estimator.bpm
+                self.advance()
+                return
+            self.rendered_pulses = self.pulse_counter
+            self._dispatch(self.on_pulse_callbacks)
             if deltatime == 0:
                 return
-            pulses_per_quarter_note = 24
-            self.estimated_bpm = 60 * (1000 / deltatime) / pulses_per_quarter_note
+            self.estimated_bpm = self.clock_estimator.bpm
 
-            if self.pulse_counter % 24 == 0:
+            if self.pulse_counter % PULSES_PER_QUARTER_NOTE == 0:
                 self.beat_number += 1
-                for callback in self.on_beat_callbacks:
-                    callback()
+                self._dispatch(self.on_beat_callbacks)
                 #print("Beat number: {}".format(self.beat_number))
                 #print("Estimated BPM: {}".format(self.estimated_bpm))
                 #print("Pulse counter: {}".format(self.pulse_counter))
@@ -47,9 +160,13 @@ class MidiInputHandler(object):
         elif message == [250]:
             print("MIDI clock enabled!")
             self.pulse_counter = 0
+            self.rendered_pulses = 0
+            self.clock_estimator.reset()
             self.pulse_effect_started = False
         elif message == [252]:
             print("MIDI clock disabled!")
             self.pulse_counter = 0
+            self.rendered_pulses = 0
+            self.clock_estimator.reset()
         else:
             print(message)
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Timings of the hot path stages, cheap enough to leave on during a gig.
+
+Every profiled call adds its duration to the ring buffer of its stage: a preallocated array of the last samples, so
+recording never allocates and memory stays bounded. Summaries (percentiles over the ring, all time max) are only
+computed when asked for: by the pygame overlay a few times per second, and by the JSON dump on exit.
+
+Stages nest: the MIDI callback includes the designer renders it triggers.
+"""
+from __future__ import print_function
+
+import array
+import functools
+import json
+import threading
+import time
+import typing
+
+RING_SIZE = 1024
+
+
+class StageTimer:
+    """
+    The last durations of one stage, in seconds. Written from one thread (whichever runs the stage), read from any.
+    """
+
+    def __init__(self, name: str, size: int = RING_SIZE):
+        self.name = name
+        self.size = size
+        self.samples = array.array("d", bytes(8 * size))
+        self.count = 0
+        """Samples ever added. The newest sample is at (count - 1) % size."""
+        self.max = 0.0
+
+    def add(self, took: float):
+        self.samples[self.count % self.size] = took
+        self.count += 1
+        if took > self.max:
+            self.max = took
+
+    def recent(self) -> typing.List[float]:
+        """
+        The samples in the ring, oldest first.
+        """
+        count = self.count
+        samples = self.samples.tolist()
+        if count <= self.size:
+            return samples[:count]
+        start = count % self.size
+        return samples[start:] + samples[:start]
+
+    def summary(self) -> typing.Dict[str, float]:
+        recent = sorted(self.recent())
+        if not recent:
+            return {"count": self.count}
+
+        def percentile(fraction: float) -> float:
+            return recent[min(int(fraction * len(recent)), len(recent) - 1)] * 1000
+
+        return {
+            "count": self.count,
+            "mean_ms": sum(recent) / len(recent) * 1000,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.max * 1000,
+        }
+
+
+class Profiler:
+    """
+    The StageTimers by stage name, and the switch to turn profiling off.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter, size: int = RING_SIZE):
+        self.clock = clock
+        self.size = size
+        self.enabled = True
+        self.stages: typing.Dict[str, StageTimer] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> StageTimer:
+        timer = self.stages.get(name)
+        if timer is None:
+            with self._lock:
+                timer = self.stages.setdefault(name, StageTimer(name, self.size))
+        return timer
+
+    def profiled(self, name: str):
+        """
+        Decorator timing every call of the function as the stage name.
+        """
+        timer = self.stage(name)
+
+        def decorator(function):
+            @functools.wraps(function)
+            def profiled_function(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = self.clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    timer.add(self.clock() - started)
+            return profiled_function
+        return decorator
+
+    def summary(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        return {name: timer.summary() for name, timer in list(self.stages.items())}
+
+    def dump(self, path: str, extra: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        """
+        Writes the summaries and the samples in the rings (in milliseconds) as JSON, plus any extra stats.
+        """
+        report = {
+            "stages": {
+                name: dict(timer.summary(), recent_ms=[took * 1000 for took in timer.recent()])
+                for name, timer in list(self.stages.items())
+            },
+        }
+        if extra is not None:
+            report.update(extra)
+        with open(path, "w") as output:
+            json.dump(report, output, indent=1)
+
+
+PROFILER = Profiler()
+"""The profiler the hot path stages report to."""
+
+
+def profiled(name: str):
+    """
+    Times every call of the decorated function as the stage name, on PROFILER.
+    """
+    return PROFILER.profiled(name)
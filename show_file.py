@@ -0,0 +1,391 @@
+"""
+Show files: the track cues as data, editable in the middle of a set.
+
+The source is JSON. Tracks in it replace the built-in cues of the same title, other tracks keep their built-in cues.
+
+    {
+      "dragon": {
+        "Hot": {
+          "mode": {"default": "PULSING_EYES"},
+          "smoke": {"default": false, "cues": [{"start": 66.6, "end": 70, "value": true}]}
+        }
+      },
+      "lightbar": {
+        "Hot": [
+          {"default": {"mode": "OFF", "clear_state": true},
+           "cues": [{"start": 20, "value": {"mode": "COLOR_WAVE", "state": "ColorwaveState",
+                                            "settings": {"colour_pallette": ["#ff9900", "$disco_pallette"]}}}]}
+        ]
+      }
+    }
+
+A dragon track has a mode cue list and an optional smoke cue list, a lightbar track is a list of cue list layers.
+Cues are open intervals unless start_inclusive/end_inclusive is set, a missing start or end is unbounded.
+Lightbar cue values take the LightbarCue fields. Colors are "#rrggbb", "$name" refers to a palette in
+lightbar_modes, and "random" is a random color, picked every time the state is created (init only).
+
+The source is compiled into a binary index next to it (show.json.idx), which is memory-mapped. The index holds the
+segment boundaries and the value of every segment of every cue list, so playback is a bisect over the mapped floats.
+ShowFileWatcher recompiles the index when the source changes and swaps the new show in atomically.
+"""
+from __future__ import print_function
+
+import array
+import bisect
+import dataclasses
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import typing
+
+from common_types import RgbPixel, UpdateFrequency, rgb_array
+from cues import Cue, CueList
+from dragon.dragon_cues import DRAGON_CUES, DragonTrackCues
+from dragon.dragon_modes import DragonMode
+from lightbar import lightbar_modes
+from lightbar.lightbar_cues import LIGHTBAR_CUES, LightbarCue, LightbarTrackCues
+from utils import generate_random_color
+
+SHOW_INDEX_MAGIC = b"MIDIMACHINE-SHOW"
+SHOW_INDEX_VERSION = 1
+# Magic, version, cue list count, boundary count, metadata size. Padded to keep the arrays after it aligned.
+SHOW_INDEX_HEADER = struct.Struct("<16sHIII6x")
+# Per cue list: first boundary, boundary count, first segment.
+SHOW_INDEX_CUE_LIST = struct.Struct("=III")
+
+RANDOM_COLOR = "random"
+
+LIGHTBAR_STATES = {state.__name__: state for state in (
+    lightbar_modes.ColorwaveState, lightbar_modes.ColorWheelState, lightbar_modes.NootNootState,
+    lightbar_modes.OrganizedUpdateOfLightbars, lightbar_modes.PixelSunstate,
+    lightbar_modes.RandomUpdateAmountOfLightbars, lightbar_modes.RetrowaveGridState, lightbar_modes.TankEngineState,
+)}
+
+NAMED_PALLETTES = {
+    "disco_pallette": lightbar_modes.disco_pallette,
+    "purple_disco": lightbar_modes.purple_disco,
+    "sky": lightbar_modes.sky,
+    "purple_sky": lightbar_modes.purple_sky,
+    "half_sun": lightbar_modes.half_sun,
+    "quarter_orange_wheel": lightbar_modes.quarter_orange_wheel,
+    "quarter_purple_wheel": lightbar_modes.quarter_purple_wheel,
+}
+
+
+@dataclasses.dataclass
+class Show:
+    """
+    The cues of every programmed track, by track title.
+    """
+    dragon: typing.Mapping[str, DragonTrackCues]
+    lightbar: typing.Mapping[str, LightbarTrackCues]
+
+
+BUILTIN_SHOW = Show(dragon=DRAGON_CUES, lightbar=LIGHTBAR_CUES)
+
+
+class CompiledCueList:
+    """
+    A cue list played back from the memory-mapped show index. Same lookup as CueList.at.
+    """
+
+    def __init__(self, boundaries: memoryview, at_boundary: memoryview, between: memoryview, values: typing.List):
+        self.boundaries = boundaries
+        self.at_boundary = at_boundary
+        self.between = between
+        self.values = values
+
+    def at(self, elapsed: float):
+        index = bisect.bisect_left(self.boundaries, elapsed)
+        if index < len(self.boundaries) and self.boundaries[index] == elapsed:
+            value = self.at_boundary[index]
+        else:
+            value = self.between[index]
+        return self.values[value] if value >= 0 else None
+
+
+def _decode_value(raw):
+    if isinstance(raw, str):
+        if raw == RANDOM_COLOR:
+            return generate_random_color()
+        if raw.startswith("#"):
+            if len(raw) != 7:
+                raise ValueError("Colors are written as #rrggbb, got {}".format(raw))
+            return RgbPixel(int(raw[1:3], 16), int(raw[3:5], 16), int(raw[5:7], 16))
+        if raw.startswith("$"):
+            return NAMED_PALLETTES[raw[1:]]
+        return raw
+    if isinstance(raw, list):
+        return [_decode_value(value) for value in raw]
+    if isinstance(raw, dict):
+        # JSON object keys are strings, the lightbar palettes are keyed by lightbar number.
+        return {int(key) if key.isdigit() else key: _decode_value(value) for key, value in raw.items()}
+    return raw
+
+
+def _decode_setting(name: str, raw):
+    if name == "update_frequency":
+        return UpdateFrequency[raw]
+    value = _decode_value(raw)
+    if name == "pixels":
+        return rgb_array(value)
+    return value
+
+
+def _contains_random_color(raw) -> bool:
+    if isinstance(raw, list):
+        return any(_contains_random_color(value) for value in raw)
+    if isinstance(raw, dict):
+        return any(_contains_random_color(value) for value in raw.values())
+    return raw == RANDOM_COLOR
+
+
+def _decode_lightbar_cue(raw: dict) -> LightbarCue:
+    fields = dict(raw)
+    if "mode" in fields:
+        fields["mode"] = lightbar_modes.Mode[fields["mode"]]
+    if "state" in fields:
+        fields["state"] = LIGHTBAR_STATES[fields["state"]]
+    init = {}
+    for name, value in fields.get("init", {}).items():
+        if _contains_random_color(value):
+            # LightbarCue calls callables when it creates the state, so every state gets new colors.
+            init[name] = lambda name=name, value=value: _decode_setting(name, value)
+        else:
+            init[name] = _decode_setting(name, value)
+    fields["init"] = init
+    settings = {}
+    for name, value in fields.get("settings", {}).items():
+        if _contains_random_color(value):
+            raise ValueError("Random colors are only supported in init, {} would change on every pulse".format(name))
+        settings[name] = _decode_setting(name, value)
+    fields["settings"] = settings
+    return LightbarCue(**fields)
+
+
+def _decode_smoke(raw) -> bool:
+    if not isinstance(raw, bool):
+        raise ValueError("Smoke cues are true or false, got {}".format(raw))
+    return raw
+
+
+VALUE_DECODERS = {
+    "dragon_mode": lambda raw: DragonMode[raw],
+    "smoke": _decode_smoke,
+    "lightbar": _decode_lightbar_cue,
+}
+
+
+def _expect(raw, kind: type, what: str):
+    if not isinstance(raw, kind):
+        raise ValueError("{} should be {}, got {!r}".format(what, "a list" if kind is list else "an object", raw))
+    return raw
+
+
+def compile_show(source: dict) -> bytes:
+    """
+    Compiles a show file source into the binary show index.
+    Every value is decoded once here as well, so a broken show file fails to compile instead of failing on stage.
+    """
+    values: typing.List[typing.Tuple[str, typing.Any]] = []
+    value_ids: typing.Dict[str, int] = {}
+    cue_lists: typing.List[CueList[int]] = []
+
+    def intern(kind: str, raw) -> int:
+        key = json.dumps([kind, raw], sort_keys=True)
+        if key not in value_ids:
+            VALUE_DECODERS[kind](raw)
+            value_ids[key] = len(values)
+            values.append((kind, raw))
+        return value_ids[key]
+
+    def add_cue_list(kind: str, raw: dict, what: str) -> int:
+        _expect(raw, dict, what)
+        cues = [Cue(
+            start=cue.get("start", -math.inf),
+            end=cue.get("end", math.inf),
+            value=intern(kind, cue["value"]),
+            start_inclusive=cue.get("start_inclusive", False),
+            end_inclusive=cue.get("end_inclusive", False),
+        ) for cue in _expect(raw.get("cues", []), list, what + " cues") if _expect(cue, dict, what + " cue")]
+        default = intern(kind, raw["default"]) if raw.get("default") is not None else None
+        cue_lists.append(CueList(cues, default=default))
+        return len(cue_lists) - 1
+
+    dragon_tracks = {}
+    _expect(source, dict, "The show")
+    for title, track in _expect(source.get("dragon", {}), dict, "dragon").items():
+        _expect(track, dict, "dragon track {}".format(title))
+        smoke = (add_cue_list("smoke", track["smoke"], "dragon smoke of {}".format(title))
+                 if track.get("smoke") is not None else None)
+        dragon_tracks[title] = [add_cue_list("dragon_mode", track["mode"], "dragon mode of {}".format(title)), smoke]
+    lightbar_tracks = {
+        title: [add_cue_list("lightbar", layer, "lightbar layer of {}".format(title))
+                for layer in _expect(layers, list, "lightbar layers of {}".format(title))]
+        for title, layers in _expect(source.get("lightbar", {}), dict, "lightbar").items()
+    }
+
+    boundaries = array.array("d")
+    at_boundary = array.array("i")
+    between = array.array("i")
+    layout = bytearray()
+    for cue_list in cue_lists:
+        layout += SHOW_INDEX_CUE_LIST.pack(len(boundaries), len(cue_list.boundaries), len(between))
+        boundaries.extend(cue_list.boundaries)
+        at_boundary.extend(-1 if value is None else value for value in cue_list.at_boundary)
+        between.extend(-1 if value is None else value for value in cue_list.between)
+
+    metadata = json.dumps({"values": values, "dragon": dragon_tracks, "lightbar": lightbar_tracks}).encode()
+    header = SHOW_INDEX_HEADER.pack(SHOW_INDEX_MAGIC, SHOW_INDEX_VERSION, len(cue_lists), len(boundaries), len(metadata))
+    return b"".join((header, boundaries.tobytes(), at_boundary.tobytes(), between.tobytes(), bytes(layout), metadata))
+
+
+def load_show_index(path: str) -> Show:
+    """
+    Memory-maps a compiled show index. The cue lists read straight from the mapping.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    if len(view) < SHOW_INDEX_HEADER.size:
+        raise ValueError("{} is not a version {} show index".format(path, SHOW_INDEX_VERSION))
+    magic, version, cue_list_count, boundary_count, metadata_size = SHOW_INDEX_HEADER.unpack_from(view)
+    if magic != SHOW_INDEX_MAGIC or version != SHOW_INDEX_VERSION:
+        raise ValueError("{} is not a version {} show index".format(path, SHOW_INDEX_VERSION))
+
+    offset = SHOW_INDEX_HEADER.size
+
+    def section(size: int, item_format: str) -> memoryview:
+        nonlocal offset
+        start = offset
+        offset += size * struct.calcsize(item_format)
+        return view[start:offset].cast(item_format)
+
+    boundaries = section(boundary_count, "d")
+    at_boundary = section(boundary_count, "i")
+    between = section(boundary_count + cue_list_count, "i")
+    layout = section(cue_list_count * 3, "I")
+    metadata = json.loads(bytes(view[offset:offset + metadata_size]))
+
+    values = [VALUE_DECODERS[kind](raw) for kind, raw in metadata["values"]]
+    cue_lists = []
+    for i in range(cue_list_count):
+        first, count, first_segment = layout[i * 3:i * 3 + 3]
+        cue_lists.append(CompiledCueList(
+            boundaries[first:first + count],
+            at_boundary[first:first + count],
+            between[first_segment:first_segment + count + 1],
+            values,
+        ))
+
+    dragon = dict(BUILTIN_SHOW.dragon)
+    for title, (mode, smoke) in metadata["dragon"].items():
+        dragon[title] = DragonTrackCues(mode=cue_lists[mode], smoke=cue_lists[smoke] if smoke is not None else None)
+    lightbar = dict(BUILTIN_SHOW.lightbar)
+    for title, layers in metadata["lightbar"].items():
+        lightbar[title] = [cue_lists[layer] for layer in layers]
+    return Show(dragon=dragon, lightbar=lightbar)
+
+
+def compile_show_file(path: str, index_path: str) -> None:
+    """
+    Compiles the show file, and replaces the index in one rename so a running show never maps a half written index.
+    """
+    with open(path) as f:
+        index = compile_show(json.load(f))
+    temporary_path = index_path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(index)
+    os.replace(temporary_path, index_path)
+
+
+def load_show_file(path: str) -> Show:
+    """
+    Loads a show file, compiling it first unless the index is already up to date.
+    """
+    index_path = path + ".idx"
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+        compile_show_file(path, index_path)
+    try:
+        return load_show_index(index_path)
+    except ValueError:
+        # Written by another version.
+        compile_show_file(path, index_path)
+        return load_show_index(index_path)
+
+
+class ShowFileWatcher:
+    """
+    Watches a show file, and hands the designers the new show when it changes.
+    A show file that does not compile is reported and the current show keeps playing.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.signature = self._signature()
+        self.show = load_show_file(path)
+        self.reload_callbacks: typing.List[typing.Callable[[Show], None]] = []
+        self.reloads = 0
+        self.stopped = threading.Event()
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def _signature(self) -> typing.Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def notify_on_reload(self, callback: typing.Callable[[Show], None]):
+        self.reload_callbacks.append(callback)
+
+    def check(self) -> bool:
+        """
+        Reloads the show if the file changed. Returns whether a new show was swapped in.
+        """
+        try:
+            signature = self._signature()
+            if signature == self.signature:
+                return False
+            self.signature = signature
+            show = load_show_file(self.path)
+        except Exception as e:
+            # Whatever is wrong with the file, the watcher keeps running and the previous cues keep playing.
+            print("Show file {} not reloaded: {!r}".format(self.path, e), file=sys.stderr)
+            return False
+
+        # Designers pick the new show up on their next render, a reference swap is atomic.
+        self.show = show
+        self.reloads += 1
+        for callback in self.reload_callbacks:
+            callback(show)
+        return True
+
+    def _run(self):
+        while not self.stopped.wait(self.poll_interval):
+            self.check()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="show-file-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python show_file.py show.json", file=sys.stderr)
+        sys.exit(1)
+    path = sys.argv[1]
+    compile_show_file(path, path + ".idx")
+    show = load_show_index(path + ".idx")
+    print("Compiled {}: {} dragon and {} lightbar tracks".format(path + ".idx", len(show.dragon), len(show.lightbar)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Records what the show got during a set: MIDI messages, the Traktor metadata posts and the DMX frames that went out,
+so a moment that looked wrong at a gig can be looked at (and replayed) afterwards.
+
+The hot paths only timestamp and copy what they hand over into a queue. A writer thread encodes the queue every
+flush_interval into a block of records and appends it to the file, zlib compressed. DMX frames are stored as the
+runs of channels that changed since the previous frame of the universe, with a full keyframe every
+KEYFRAME_INTERVAL seconds.
+
+File: MAGIC, FILE_HEADER (version, wall clock time the recording started), then blocks. A block is BLOCK_HEADER
+(time of the block in microseconds since the start, record count, compressed size) and the compressed records.
+A record is RECORD_HEADER (kind, microseconds since the previous record, payload size) and the payload:
+
+    MIDI: rtmidi delta time (float), message bytes
+    METADATA: request path, a 0 byte, request body
+    DMX_KEYFRAME: universe number, all channels
+    DMX_DELTA: universe number, then per changed run: first channel (0-indexed), run length, channel values
+
+Print a summary of a recording with:
+
+    python -m show_recorder show.rec
+"""
+from __future__ import print_function
+
+import collections
+import dataclasses
+import os
+import struct
+import sys
+import threading
+import time
+import typing
+import zlib
+
+import numpy
+
+MAGIC = b"MIDIMACHINE-REC\x00"
+"""Not the magic of the compiled show index (show_file.py), the readers tell the two apart."""
+VERSION = 1
+FILE_HEADER = struct.Struct("<Hd")  # version, wall clock start time
+BLOCK_HEADER = struct.Struct("<QII")  # block time (us), records, compressed size
+RECORD_HEADER = struct.Struct("<BII")  # kind, time since the previous record (us), payload size
+MIDI_HEADER = struct.Struct("<f")  # rtmidi delta time
+UNIVERSE_HEADER = struct.Struct("<H")
+RUN_HEADER = struct.Struct("<HH")  # first channel, length
+
+MIDI = 1
+METADATA = 2
+DMX_KEYFRAME = 3
+DMX_DELTA = 4
+KINDS = {MIDI: "midi", METADATA: "metadata", DMX_KEYFRAME: "dmx keyframe", DMX_DELTA: "dmx delta"}
+
+KEYFRAME_INTERVAL = 10.0
+RUN_GAP = RUN_HEADER.size
+"""Unchanged channels between two changed runs up to this many are stored in the run, it's cheaper than a new run."""
+
+
+class ShowRecorder:
+    """
+    Appends timestamped MIDI, metadata and DMX records to a show recording, see the module docstring.
+    midi, metadata and dmx can be called from any thread.
+    """
+
+    def __init__(self, path: str, clock: typing.Callable[[], float] = time.perf_counter,
+                 flush_interval: float = 0.5, max_pending: int = 100000, compression: int = 1):
+        self.path = path
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        """Records waiting for the writer. Beyond this (a stuck disk), new records are dropped and counted."""
+        self.compression = compression
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self._started = clock()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._file.write(FILE_HEADER.pack(VERSION, time.time()))
+        self._pending: typing.Deque[typing.Tuple[int, float, typing.Any, bytes]] = collections.deque()
+        self._previous_time = 0
+        self._universes: typing.Dict[int, typing.Tuple[numpy.ndarray, float]] = {}
+        """Per universe: the frame deltas are taken against, and when its last keyframe was written."""
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="show-recorder", daemon=True)
+
+    def start(self) -> None:
+        self._running = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+        self._write_pending()
+        self._file.close()
+
+    def midi(self, message: typing.Sequence[int], deltatime: float) -> None:
+        self._add(MIDI, deltatime, bytes(message))
+
+    def metadata(self, path: str, body: bytes) -> None:
+        self._add(METADATA, path, bytes(body))
+
+    def dmx(self, universe: int, data: typing.Union[bytes, bytearray, memoryview]) -> None:
+        self._add(DMX_KEYFRAME, universe, bytes(data))
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "records": self.records,
+            "dropped": self.dropped,
+            "bytes_written": self.bytes_written,
+            "pending": len(self._pending),
+        }
+
+    def _add(self, kind: int, key: typing.Any, data: bytes) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((kind, self.clock(), key, data))
+
+    def _run(self) -> None:
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        block = bytearray()
+        count = 0
+        block_time = None
+        while self._pending:
+            kind, timestamp, key, data = self._pending.popleft()
+            now = max(int((timestamp - self._started) * 1000000), self._previous_time)
+            if block_time is None:
+                block_time = self._previous_time = now
+            payload = self._encode(kind, timestamp, key, data)
+            if payload is None:
+                continue
+            kind, payload = payload
+            block += RECORD_HEADER.pack(kind, now - self._previous_time, len(payload))
+            block += payload
+            self._previous_time = now
+            count += 1
+        if not count:
+            return
+        compressed = zlib.compress(bytes(block), self.compression)
+        self._file.write(BLOCK_HEADER.pack(block_time, count, len(compressed)))
+        self._file.write(compressed)
+        self._file.flush()
+        self.records += count
+        self.bytes_written += BLOCK_HEADER.size + len(compressed)
+
+    def _encode(self, kind: int, timestamp: float, key: typing.Any,
+                data: bytes) -> typing.Optional[typing.Tuple[int, bytes]]:
+        if kind == MIDI:
+            return MIDI, MIDI_HEADER.pack(key) + data
+        if kind == METADATA:
+            return METADATA, key.encode("utf-8") + b"\x00" + data
+
+        frame = numpy.frombuffer(data, dtype=numpy.uint8)
+        previous = self._universes.get(key)
+        if previous is None or len(previous[0]) != len(frame) or timestamp - previous[1] >= KEYFRAME_INTERVAL:
+            self._universes[key] = (frame, timestamp)
+            return DMX_KEYFRAME, UNIVERSE_HEADER.pack(key) + data
+        changed = numpy.flatnonzero(frame != previous[0])
+        if not len(changed):
+            return None
+        self._universes[key] = (frame, previous[1])
+        breaks = numpy.flatnonzero(numpy.diff(changed) > RUN_GAP + 1)
+        starts = changed[numpy.concatenate(([0], breaks + 1))].tolist()
+        ends = (changed[numpy.concatenate((breaks, [len(changed) - 1]))] + 1).tolist()
+        payload = bytearray(UNIVERSE_HEADER.pack(key))
+        for start, end in zip(starts, ends):
+            payload += RUN_HEADER.pack(start, end - start)
+            payload += data[start:end]
+        return DMX_DELTA, bytes(payload)
+
+
+@dataclasses.dataclass(frozen=True)
+class ShowRecord:
+    time: float
+    """Seconds since the recording started."""
+    kind: int
+    message: typing.Optional[typing.List[int]] = None
+    deltatime: typing.Optional[float] = None
+    path: typing.Optional[str] = None
+    body: typing.Optional[bytes] = None
+    universe: typing.Optional[int] = None
+    data: typing.Optional[bytes] = None
+    """The whole universe, deltas applied."""
+
+
+def read_show(path: str) -> typing.Iterator[ShowRecord]:
+    """
+    The records of a show recording in order. A block cut off at the end (the show was killed) ends the recording.
+    Raises ValueError for anything that is not a show recording.
+    """
+    with open(path, "rb") as recording:
+        if recording.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a midimachine show recording.")
+        version, _ = FILE_HEADER.unpack(recording.read(FILE_HEADER.size))
+        if version != VERSION:
+            raise ValueError("Show recording version {} is not supported.".format(version))
+
+        universes: typing.Dict[int, bytearray] = {}
+        while True:
+            header = recording.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            block_time, count, size = BLOCK_HEADER.unpack(header)
+            compressed = recording.read(size)
+            if len(compressed) < size:
+                return
+            block = zlib.decompress(compressed)
+            offset = 0
+            now = block_time
+            for _ in range(count):
+                kind, delta, length = RECORD_HEADER.unpack_from(block, offset)
+                offset += RECORD_HEADER.size
+                payload = block[offset:offset + length]
+                offset += length
+                now += delta
+                yield _decode(kind, now / 1000000, payload, universes)
+
+
+def _decode(kind: int, seconds: float, payload: bytes, universes: typing.Dict[int, bytearray]) -> ShowRecord:
+    if kind == MIDI:
+        deltatime, = MIDI_HEADER.unpack_from(payload)
+        return ShowRecord(seconds, kind, message=list(payload[MIDI_HEADER.size:]), deltatime=deltatime)
+    if kind == METADATA:
+        path, _, body = payload.partition(b"\x00")
+        return ShowRecord(seconds, kind, path=path.decode("utf-8"), body=body)
+
+    universe, = UNIVERSE_HEADER.unpack_from(payload)
+    if kind == DMX_KEYFRAME:
+        universes[universe] = bytearray(payload[UNIVERSE_HEADER.size:])
+    else:
+        data = universes[universe]
+        offset = UNIVERSE_HEADER.size
+        while offset < len(payload):
+            start, length = RUN_HEADER.unpack_from(payload, offset)
+            offset += RUN_HEADER.size
+            data[start:start + length] = payload[offset:offset + length]
+            offset += length
+    return ShowRecord(seconds, kind, universe=universe, data=bytes(universes[universe]))
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python -m show_recorder <recording>", file=sys.stderr)
+        sys.exit(2)
+    counts: typing.Counter[str] = collections.Counter()
+    duration = 0.0
+    for record in read_show(sys.argv[1]):
+        counts[KINDS[record.kind]] += 1
+        duration = record.time
+    size = os.path.getsize(sys.argv[1])
+    print("{:.1f}s, {} bytes ({:.0f} bytes/s)".format(duration, size, size / duration if duration else 0))
+    for kind, count in sorted(counts.items()):
+        print("{}: {}".format(kind, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Receives the track metadata the Traktor mod (S2MK3_mod/ApiClient.js) posts, every 50ms per deck.
+
+A minimal HTTP/1.1 server on asyncio, speaking just enough HTTP for the mod's XMLHttpRequests: one JSON body per
+request, parsed once, no framework. It runs its event loop in its own thread, like the Flask app did, and keeps the
+same endpoints and responses.
+"""
+from __future__ import print_function
+
+import asyncio
+import json
+import threading
+import typing
+
+from profiling import profiled
+from traktor_metadata import TraktorMetadata
+
+if typing.TYPE_CHECKING:
+    from show_recorder import ShowRecorder
+
+SUCCESS = b'{"success":true}\n'
+MAX_BODY_SIZE = 64 * 1024
+STATUS_LINES = {
+    200: b"HTTP/1.1 200 OK\r\n",
+    400: b"HTTP/1.1 400 Bad Request\r\n",
+    404: b"HTTP/1.1 404 Not Found\r\n",
+}
+
+
+@profiled("metadata ingest")
+def handle_request(traktor_metadata: TraktorMetadata, method: str, path: str, body: bytes,
+                   recorder: typing.Optional["ShowRecorder"] = None) -> typing.Tuple[int, bytes, bytes]:
+    """
+    Applies one request to the metadata. Returns the status, content type and body of the response.
+    With a recorder, the metadata posts are recorded as they came in.
+    """
+    parts = path.strip("/").split("/")
+    if parts[0] == "deckLoaded" and len(parts) == 2:
+        if method == "POST":
+            if recorder is not None:
+                recorder.metadata(path, body)
+            payload = json.loads(body)
+            if parts[1] == "1":
+                traktor_metadata.current_track_deck_a = payload["value"]
+                traktor_metadata.current_track_elapsed_deck_a = payload["elapsed"]
+            elif parts[1] == "2":
+                traktor_metadata.current_track_deck_b = payload["value"]
+                traktor_metadata.current_track_elapsed_deck_b = payload["elapsed"]
+        return 200, b"application/json", SUCCESS
+    if parts[0] == "updateMasterClock" and len(parts) == 1:
+        if method == "POST":
+            if recorder is not None:
+                recorder.metadata(path, body)
+            payload = json.loads(body)
+            traktor_metadata.master_deck = payload["deck"]
+            traktor_metadata.master_deck_change_handled = False
+            print(payload)
+        return 200, b"application/json", SUCCESS
+    if parts[0] == "success" and len(parts) == 2:
+        return 200, b"text/html; charset=utf-8", "welcome {}".format(parts[1]).encode()
+    return 404, b"text/plain", b"Not Found"
+
+
+async def handle_connection(traktor_metadata: TraktorMetadata, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            recorder: typing.Optional["ShowRecorder"] = None):
+    """
+    Serves requests on one connection until the client closes it. XMLHttpRequest keeps connections alive.
+    """
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length", 0))
+            if content_length > MAX_BODY_SIZE:
+                break
+            body = await reader.readexactly(content_length)
+            try:
+                status, content_type, response = handle_request(traktor_metadata, method, path, body, recorder)
+            except (ValueError, KeyError, TypeError) as e:
+                status, content_type, response = 400, b"text/plain", repr(e).encode()
+
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            writer.write(b"".join((
+                STATUS_LINES[status],
+                b"Content-Type: ", content_type, b"\r\n",
+                b"Content-Length: ", str(len(response)).encode(), b"\r\n",
+                b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n",
+                response,
+            )))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+
+class MetadataServer:
+    """
+    Runs the metadata endpoints on an asyncio event loop in a background thread.
+    """
+
+    def __init__(self, traktor_metadata: TraktorMetadata, host: str = "127.0.0.1", port: int = 5000,
+                 recorder: typing.Optional["ShowRecorder"] = None):
+        self.traktor_metadata = traktor_metadata
+        self.recorder = recorder
+        self.host = host
+        self.port = port
+        self.loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.server: typing.Optional[asyncio.AbstractServer] = None
+        self.started = threading.Event()
+        self.error: typing.Optional[OSError] = None
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="metadata-server", daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(
+                lambda reader, writer: handle_connection(self.traktor_metadata, reader, writer, self.recorder), self.host, self.port))
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            self.loop.close()
+            return
+        # Tells start() the actual port, when port 0 asked for a free one.
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            connections = asyncio.all_tasks(self.loop)
+            for connection in connections:
+                connection.cancel()
+            self.loop.run_until_complete(asyncio.gather(*connections, return_exceptions=True))
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
@@ -0,0 +1,95 @@
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+import time
+import typing
+
+from dragon.dragon_designer import DragonDesigner
+from lightbar.lightbar_designer import LightbarDesigner
+from midi.clock_estimator import PULSES_PER_QUARTER_NOTE
+from midi.midi_input_handler import MidiInputHandler
+from show_file import Show, load_show_file
+from stage.headless_adapter import HeadlessRecorder, map_stage_to_headless
+from stage.stage import create_stage
+from stage.timed_actions import TimedActions
+from traktor_metadata import TraktorMetadata
+
+
+def simulate_show(track: str, bpm: float, duration: float, recorder: HeadlessRecorder, frame_rate: float = 44,
+                  show: typing.Optional[Show] = None) -> int:
+    """
+    Plays the track on a synthetic MIDI clock as fast as the CPU allows, and records the output at frame_rate.
+    Returns the number of MIDI clock pulses sent.
+    """
+    traktor_metadata = TraktorMetadata()
+    # The playhead and the MIDI clock estimator run on the synthetic clock, elapsed time is reported every frame and pulse.
+    synthetic_time = [0.0]
+    traktor_metadata.clock = lambda: synthetic_time[0]
+    traktor_metadata.master_deck = "A"
+    traktor_metadata.master_deck_change_handled = False
+    traktor_metadata.current_track_deck_a = track
+
+    midi_input_handler = MidiInputHandler("simulated clock")
+    midi_input_handler.clock = traktor_metadata.clock
+    stage = create_stage(traktor_metadata)
+    LightbarDesigner(midi_input_handler, stage.lightbar_one, stage.lightbar_three, stage.lightbar_two, traktor_metadata, stage.lightbar_strip, show)
+    timed_actions = TimedActions(midi_input_handler.clock)
+    DragonDesigner(midi_input_handler, stage, show, timed_actions)
+
+    pulse_interval = 60 / (bpm * PULSES_PER_QUARTER_NOTE)
+    frame_interval = 1 / frame_rate
+
+    midi_input_handler(([250], 0))  # MIDI start
+    pulses = 0
+    next_frame = 0.0
+    while next_frame < duration:
+        pulse_time = pulses * pulse_interval
+        # Output every frame that is due before the next pulse.
+        while next_frame <= pulse_time and next_frame < duration:
+            synthetic_time[0] = next_frame
+            traktor_metadata.current_track_elapsed_deck_a = next_frame
+            timed_actions.run_due()
+            midi_input_handler.render_frame()
+            map_stage_to_headless(stage, recorder)
+            next_frame += frame_interval
+
+        synthetic_time[0] = pulse_time
+        traktor_metadata.current_track_elapsed_deck_a = pulse_time
+        # rtmidi gives the time since the previous message in seconds.
+        midi_input_handler(([248], pulse_interval))
+        pulses += 1
+
+    return pulses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a programmed track offline, faster than real time.")
+    parser.add_argument("track", help="Track title, as Traktor reports it.")
+    parser.add_argument("bpm", type=float)
+    parser.add_argument("duration", type=float, help="Seconds of the track to render.")
+    parser.add_argument("--output", default="show.frames", help="Frame recording to write.")
+    parser.add_argument("--frame-rate", type=float, default=44)
+    parser.add_argument("--record-strip", action="store_true", help="Also record the lightbar pixels as RGB.")
+    parser.add_argument("--show", default=None, help="Show file with cues to play on top of the built-in ones.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed the random effects, for comparable recordings.")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    started = time.perf_counter()
+    with open(args.output, "wb") as output:
+        recorder = HeadlessRecorder(output, record_strip=args.record_strip)
+        pulses = simulate_show(args.track, args.bpm, args.duration, recorder, args.frame_rate,
+                               load_show_file(args.show) if args.show is not None else None)
+        recorder.close()
+    took = time.perf_counter() - started
+
+    print("Rendered {} pulses into {} frames in {:.2f}s ({:.0f}x real time): {}".format(
+        pulses, recorder.frames, took, args.duration / took, args.output), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
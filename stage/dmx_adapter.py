@@ -1,109 +1,140 @@
 from __future__ import print_function
 
-import DMXEnttecPro.src.DMXEnttecPro.controller as dmx_driver
-from stage.stage import Stage_2023
-
-
-# Channel 1-96 (96ch, 3ch per pixel): Lightbar left
-# Channel 97-192 (96ch, 3ch per pixel): Lightbar Center
-# Channel 193-288 (96ch, 3ch per pixel): Lightbar Right
-# Channel 289-295 (7ch, ch 1 = master dimmer?, ch2,3,4 = RGB?): Dragon left eye left
-# Channel 296-302(7ch): Dragon left eye right
-# Channel 303-308 (6ch, ch1 smoke emit, ch2 hardcode 0 for color select, ch3-5 is RGB): Dragon left smoke
-# Channel 309-315(7ch): Dragon right eye left
-# Channel 316-322 (7ch): Dragon right eye right
-# Channel 323-328 (6ch, ch1 smoke emit, ch2 hardcode 0 for color select, ch3-5 is RGB): Dragon right smoke
-
-
-def map_stage_to_dmx(stage: Stage_2023, dmx_controller: dmx_driver) -> None:
-
-    # Map left lightbar
-    current_channel = 1
-    for pixel in stage.lightbar_one.pixels:
-        dmx_controller.set_channel(current_channel, pixel.red)
-        dmx_controller.set_channel(current_channel+1, pixel.green)
-        dmx_controller.set_channel(current_channel+2, pixel.blue)
-        current_channel += 3
-
-    assert current_channel == 97
-
-    # Map center lightbar
-    for pixel in stage.lightbar_two.pixels:
-        dmx_controller.set_channel(current_channel, pixel.red)
-        dmx_controller.set_channel(current_channel+1, pixel.green)
-        dmx_controller.set_channel(current_channel+2, pixel.blue)
-        current_channel += 3
-
-    assert current_channel == 193
-
-    # Map right lightbar
-    for pixel in stage.lightbar_three.pixels:
-        dmx_controller.set_channel(current_channel, pixel.red)
-        dmx_controller.set_channel(current_channel+1, pixel.green)
-        dmx_controller.set_channel(current_channel+2, pixel.blue)
-        current_channel += 3
-
-    assert current_channel == 289
-
-    # Map left-dragon left-eye
-    dmx_controller.set_channel(current_channel, 255)  # Master dimmer?
-    dmx_controller.set_channel(current_channel+1, stage.dragon_left.left_eye.red)  # Red?
-    dmx_controller.set_channel(current_channel+2, stage.dragon_left.left_eye.green)  # Green?
-    dmx_controller.set_channel(current_channel+3, stage.dragon_left.left_eye.blue)  # Blue?
-    current_channel += 7
-
-    assert current_channel == 296
-
-    # Map left-dragon right-eye
-    dmx_controller.set_channel(current_channel, 255)  # Master dimmer?
-    dmx_controller.set_channel(current_channel+1, stage.dragon_left.right_eye.red)  # Red?
-    dmx_controller.set_channel(current_channel+2, stage.dragon_left.right_eye.green)  # Green?
-    dmx_controller.set_channel(current_channel+3, stage.dragon_left.right_eye.blue)  # Blue?
-
-    current_channel += 7
-
-    assert current_channel == 303
-
-    # Map left-dragon smoke
-    dmx_controller.set_channel(current_channel, 255 if stage.dragon_left.smoke_machine_on else 0)  # Smoke emit
-    dmx_controller.set_channel(current_channel+1, 0)  # Hardcode 0 for color select
-    dmx_controller.set_channel(current_channel+2, 0)  # Red
-    dmx_controller.set_channel(current_channel+3, 255 if stage.dragon_left.smoke_machine_on else 0)  # Green
-    dmx_controller.set_channel(current_channel+4, 0)  # Blue
-
-    current_channel += 6
-
-    assert current_channel == 309
-
-    # Map right-dragon left-eye
-    dmx_controller.set_channel(current_channel, 255)  # Master dimmer?
-    dmx_controller.set_channel(current_channel+1, stage.dragon_right.left_eye.red)  # Red?
-    dmx_controller.set_channel(current_channel+2, stage.dragon_right.left_eye.green)  # Green?
-    dmx_controller.set_channel(current_channel+3, stage.dragon_right.left_eye.blue)  # Blue?
-
-    current_channel += 7
-
-    assert current_channel == 316
-
-    # Map right-dragon right-eye
-    dmx_controller.set_channel(current_channel, 255)  # Master dimmer?
-    dmx_controller.set_channel(current_channel+1, stage.dragon_right.right_eye.red)  # Red?
-    dmx_controller.set_channel(current_channel+2, stage.dragon_right.right_eye.green)  # Green?
-    dmx_controller.set_channel(current_channel+3, stage.dragon_right.right_eye.blue)
-
-    current_channel += 7
-
-    assert current_channel == 323
-
-    # Map right-dragon smoke
-    dmx_controller.set_channel(current_channel, 255 if stage.dragon_right.smoke_machine_on else 0)  # Smoke emit
-    dmx_controller.set_channel(current_channel+1, 0)  # Hardcode 0 for color select
-    dmx_controller.set_channel(current_channel+2, 0)  # Red
-    dmx_controller.set_channel(current_channel+3, 255 if stage.dragon_right.smoke_machine_on else 0)  # Green
-    dmx_controller.set_channel(current_channel+4, 0)  # Blue
-
-    current_channel += 6
-
-    assert current_channel == 329
-
-    dmx_controller.submit()
\ No newline at end of file
+import typing
+
+import numpy
+
+from dmx.network import NetworkDmxSender
+from dmx.output_worker import DmxOutputWorker
+from dmx.patch import CompiledPatch, FixtureLayout, PatchEntry, compile_patch
+from dmx.personalities import LED_PAR_7CH, PIXEL_BAR_96CH, PIXEL_BAR_VALUES, SMOKE_MACHINE_6CH
+from dmx.universe import submit_universe
+from dragon.dragon import Dragon
+from profiling import profiled
+from stage.stage import Stage_2023, StageChangeTracker
+
+if typing.TYPE_CHECKING:
+    # Only needed for the controller type, so the stage can be rendered to a universe without the driver (headless).
+    import DMXEnttecPro.src.DMXEnttecPro.controller as dmx_driver
+
+LIGHTBARS = ("lightbar_one", "lightbar_two", "lightbar_three")
+DRAGONS = ("dragon_left", "dragon_right")
+
+DRAGON_VALUES = ("left_eye.red", "left_eye.green", "left_eye.blue",
+                 "right_eye.red", "right_eye.green", "right_eye.blue",
+                 "smoke.emit")
+"""The values of a dragon: both eyes, and the smoke machine (255 or 0)."""
+
+
+def _stage_fixtures() -> typing.Dict[str, typing.Tuple[int, typing.Tuple[str, ...]]]:
+    fixtures = {}
+    offset = 0
+    for name in LIGHTBARS:
+        fixtures[name] = (offset, PIXEL_BAR_VALUES)
+        offset += len(PIXEL_BAR_VALUES)
+    for name in DRAGONS:
+        fixtures[name] = (offset, DRAGON_VALUES)
+        offset += len(DRAGON_VALUES)
+    return fixtures
+
+
+def dragon_values(dragon: Dragon) -> typing.Tuple[int, ...]:
+    return (dragon.left_eye.red, dragon.left_eye.green, dragon.left_eye.blue,
+            dragon.right_eye.red, dragon.right_eye.green, dragon.right_eye.blue,
+            255 if dragon.smoke_machine_on else 0)
+
+
+def gather_stage(stage: Stage_2023, values: numpy.ndarray, changed: typing.Optional[typing.Set[str]] = None) -> None:
+    """
+    Copies the fixture values of the stage into the value buffer of STAGE_LAYOUT.
+    """
+    for name in LIGHTBARS:
+        if changed is None or name in changed:
+            offset = STAGE_LAYOUT.fixtures[name][0]
+            values[offset:offset + len(PIXEL_BAR_VALUES)] = getattr(stage, name).rgb.reshape(-1)
+    for name in DRAGONS:
+        if changed is None or name in changed:
+            offset = STAGE_LAYOUT.fixtures[name][0]
+            values[offset:offset + len(DRAGON_VALUES)] = dragon_values(getattr(stage, name))
+
+
+_fixtures = _stage_fixtures()
+STAGE_LAYOUT = FixtureLayout(
+    fixtures=_fixtures,
+    size=sum(len(names) for _, names in _fixtures.values()),
+    gather=gather_stage,
+)
+"""The fixtures of Stage_2023 by their fixture_states names."""
+
+
+def stage_2023_patch(universe: int = 1) -> typing.List[PatchEntry]:
+    """
+    The rig of the 2023 show, all in one universe:
+
+    Channel 1-96, 97-192, 193-288: left, center and right lightbar, 3 channels per pixel
+    Channel 289-308: dragon left, its left eye, right eye and smoke machine
+    Channel 309-328: dragon right, its left eye, right eye and smoke machine
+    """
+    entries = [PatchEntry(name, PIXEL_BAR_96CH, universe, 1 + i * len(PIXEL_BAR_VALUES))
+               for i, name in enumerate(LIGHTBARS)]
+    for name, address in zip(DRAGONS, (289, 309)):
+        entries += [
+            PatchEntry(name, LED_PAR_7CH, universe, address, part="left_eye"),
+            PatchEntry(name, LED_PAR_7CH, universe, address + 7, part="right_eye"),
+            PatchEntry(name, SMOKE_MACHINE_6CH, universe, address + 14, part="smoke"),
+        ]
+    return entries
+
+
+def compile_stage_patch(entries: typing.Optional[typing.Sequence[PatchEntry]] = None) -> CompiledPatch:
+    """
+    Compiles a patch of Stage_2023, the 2023 rig if no entries are given.
+    """
+    return compile_patch(entries if entries is not None else stage_2023_patch(), STAGE_LAYOUT)
+
+
+@profiled("dmx output")
+def map_stage_to_dmx(stage: Stage_2023,
+                     dmx_controller: typing.Union["dmx_driver.Controller", NetworkDmxSender, DmxOutputWorker],
+                     patch: typing.Optional[CompiledPatch] = None,
+                     change_tracker: typing.Optional[StageChangeTracker] = None) -> bool:
+    """
+    Renders the stage through the patch, and hands every patched universe to the controller.
+    Pass in a patch to reuse its buffers between frames. With a change tracker (and a reused patch),
+    only the fixtures that changed since the last call are gathered again.
+    With a DmxOutputWorker instead of the controller, the universes are only handed over and written on the worker's
+    thread. The Enttec controller drives one universe, it gets the lowest patched one.
+    Returns whether a frame was submitted, identical universes are skipped. A network sender without the worker gets
+    its quiet universes refreshed here.
+    """
+    if patch is None:
+        patch = compile_stage_patch()
+
+    changed = None
+    if change_tracker is not None:
+        changed = change_tracker.changed(stage)
+        if not changed:
+            if isinstance(dmx_controller, NetworkDmxSender):
+                dmx_controller.refresh()
+            return False
+
+    patch.render(stage, changed)
+    target = dmx_controller.dmx_controller if isinstance(dmx_controller, DmxOutputWorker) else dmx_controller
+    if isinstance(target, NetworkDmxSender):
+        universes = list(patch.universes.items())
+    else:
+        universes = [(None, next(iter(patch.universes.values())))]
+
+    submitted = False
+    for number, universe in universes:
+        if isinstance(dmx_controller, DmxOutputWorker):
+            submitted = dmx_controller.send(universe, number) or submitted
+        elif number is None:
+            submitted = submit_universe(universe, dmx_controller) or submitted
+        elif universe.submitted is None or universe.data != universe.submitted:
+            dmx_controller.send(number, universe.data)
+            universe.submitted = bytes(universe.data)
+            submitted = True
+    if isinstance(dmx_controller, NetworkDmxSender):
+        dmx_controller.refresh()
+    return submitted
@@ -0,0 +1,73 @@
+from __future__ import print_function
+
+import time
+import typing
+
+
+class FrameScheduler:
+    """
+    Fixed rate clock for the output loop.
+
+    Every frame has an absolute deadline on a fixed grid, so render and output time does not add up to drift
+    like a plain sleep after the work does. The typical oversleep of time.sleep is measured and slept off early.
+    Frames that start late are counted, and deadlines that passed entirely are skipped and counted as missed,
+    instead of bursting out frames to catch up.
+    """
+
+    def __init__(self,
+                 rate_hz: float = 44,
+                 late_tolerance: float = 0.002,
+                 clock: typing.Callable[[], float] = time.perf_counter,
+                 sleep: typing.Callable[[float], None] = time.sleep):
+        self.rate_hz = rate_hz
+        self.period = 1 / rate_hz
+        self.late_tolerance = late_tolerance
+        """A frame starting more than this many seconds after its deadline counts as late."""
+        self.clock = clock
+        self.sleep = sleep
+
+        self.next_deadline: typing.Optional[float] = None
+        self.oversleep = 0.0
+        """Moving average of how much later than asked time.sleep returns."""
+        self.frames = 0
+        self.late_frames = 0
+        self.missed_frames = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def wait(self) -> float:
+        """
+        Blocks until the next frame is due. Returns how late (in seconds) the frame starts.
+        """
+        if self.next_deadline is None:
+            self.next_deadline = self.clock()
+
+        remaining = self.next_deadline - self.clock()
+        if remaining > self.oversleep:
+            asked = remaining - self.oversleep
+            before = self.clock()
+            self.sleep(asked)
+            self.oversleep += 0.1 * ((self.clock() - before - asked) - self.oversleep)
+
+        lateness = self.clock() - self.next_deadline
+        self.frames += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        if lateness > self.late_tolerance:
+            self.late_frames += 1
+
+        # Stay on the grid, skipping the deadlines that already passed.
+        missed = int(lateness // self.period) if lateness > 0 else 0
+        self.missed_frames += missed
+        self.next_deadline += (missed + 1) * self.period
+        return lateness
+
+    def stats(self) -> typing.Dict[str, float]:
+        return {
+            "rate_hz": self.rate_hz,
+            "frames": self.frames,
+            "late_frames": self.late_frames,
+            "missed_frames": self.missed_frames,
+            "max_lateness_ms": self.max_lateness * 1000,
+            "oversleep_ms": self.oversleep * 1000,
+        }
@@ -0,0 +1,86 @@
+from __future__ import print_function
+
+import dataclasses
+import io
+import struct
+import typing
+
+from dmx.patch import CompiledPatch
+from stage.dmx_adapter import compile_stage_patch
+from stage.stage import Stage_2023
+
+RECORDING_MAGIC = b"MIDIMACHINE-FRAMES"
+RECORDING_HEADER = struct.Struct("<HH")  # universe size, lightbar strip size (0 if not recorded)
+
+
+class HeadlessRecorder:
+    """
+    Output without a window or hardware: records the DMX universe of every frame, and optionally the lightbar
+    strip as RGB, into a memory buffer or a file. The stage is rendered through the patch (the 2023 rig by default),
+    the lowest patched universe is recorded.
+
+    The recording is a small header followed by fixed size frames, so two recordings can be compared frame by frame.
+    """
+
+    def __init__(self, output: typing.Optional[typing.BinaryIO] = None, record_strip: bool = False, strip_size: int = 96 * 3,
+                 patch: typing.Optional[CompiledPatch] = None):
+        self.output = output if output is not None else io.BytesIO()
+        self.patch = patch if patch is not None else compile_stage_patch()
+        self.universe = next(iter(self.patch.universes.values()))
+        self.strip_size = strip_size if record_strip else 0
+        self.frames = 0
+
+        self.output.write(RECORDING_MAGIC)
+        self.output.write(RECORDING_HEADER.pack(len(self.universe), self.strip_size))
+
+    def record(self, stage: Stage_2023) -> None:
+        self.output.write(self.universe.data)
+        if self.strip_size:
+            self.output.write(stage.lightbar_strip.tobytes())
+        self.frames += 1
+
+    def close(self) -> None:
+        self.output.flush()
+        if not isinstance(self.output, io.BytesIO):
+            self.output.close()
+
+
+def map_stage_to_headless(stage: Stage_2023, recorder: HeadlessRecorder) -> None:
+    recorder.patch.render(stage)
+    recorder.record(stage)
+
+
+@dataclasses.dataclass
+class Recording:
+    universes: typing.List[bytes]
+    strips: typing.Optional[typing.List[bytes]] = None
+
+
+def read_recording(recording: typing.BinaryIO) -> Recording:
+    if recording.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+        raise ValueError("Not a midimachine frame recording.")
+    universe_size, strip_size = RECORDING_HEADER.unpack(recording.read(RECORDING_HEADER.size))
+
+    result = Recording(universes=[], strips=[] if strip_size else None)
+    frame_size = universe_size + strip_size
+    while True:
+        frame = recording.read(frame_size)
+        if len(frame) < frame_size:
+            return result
+        result.universes.append(frame[:universe_size])
+        if strip_size:
+            result.strips.append(frame[universe_size:])
+
+
+def first_difference(expected: Recording, actual: Recording) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Compares the DMX output of two recordings.
+    Returns (frame, channel) of the first difference, with channel 0 for a difference in length, or None if equal.
+    """
+    for frame, (expected_universe, actual_universe) in enumerate(zip(expected.universes, actual.universes)):
+        if expected_universe != actual_universe:
+            channel = next(i for i, (a, b) in enumerate(zip(expected_universe, actual_universe)) if a != b) + 1
+            return frame, channel
+    if len(expected.universes) != len(actual.universes):
+        return min(len(expected.universes), len(actual.universes)), 0
+    return None
@@ -1,26 +1,60 @@
 from __future__ import print_function
 
+import functools
+import typing
+
 import pygame
 
 from dragon.dragon import Dragon
 from lightbar.lightbar import LightBar
-from stage.stage import Stage_2023
+from profiling import Profiler, profiled
+from stage.stage import Stage_2023, StageChangeTracker
+
+PROFILE_AREA = pygame.Rect(5, 5, 335, 185)
+"""Free corner left of the dragons the profile overlay draws in."""
+
+
+@functools.lru_cache(maxsize=None)
+def load_image(path: str, size: typing.Tuple[int, int], rotation: int = 0) -> pygame.Surface:
+    """
+    Loads, scales and rotates an image once, and converts it to the display format if there is a display.
+    """
+    image = pygame.image.load(path)
+    image = pygame.transform.scale(image, size)
+    if rotation:
+        image = pygame.transform.rotate(image, rotation)
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha() if image.get_alpha() is not None else image.convert()
+    return image
+
 
+@functools.lru_cache(maxsize=None)
+def get_font(name: typing.Optional[str], size: int) -> pygame.font.Font:
+    return pygame.font.SysFont(name, size)
 
-def lightbar_to_pygame(lightbar: LightBar, x_pos: int, y_pos: int, surface) -> None:
+
+@functools.lru_cache(maxsize=32)
+def render_text(text: str, font_name: typing.Optional[str], size: int) -> pygame.Surface:
     """
-    Draws the lightbar in the pygame window at the specified position.
+    Renders white text. Only renders again when the text changes.
+    """
+    return get_font(font_name, size).render(text, True, (255, 255, 255))
+
+
+def lightbar_to_pygame(lightbar: LightBar, x_pos: int, y_pos: int, surface) -> pygame.Rect:
+    """
+    Draws the lightbar in the pygame window at the specified position. Returns the area it draws in.
     """
 
     pixel_size = 10
-    for i in range(len(lightbar.pixels)):
+    for i, color in enumerate(lightbar.rgb.tolist()):
         final_position = x_pos + i * pixel_size
         if i != 0:
             # Pad between pixels
             final_position += 2 * i
         pygame.draw.rect(
             surface=surface,
-            color=(lightbar.pixels[i].red, lightbar.pixels[i].green, lightbar.pixels[i].blue),
+            color=color,
             rect=pygame.Rect(final_position, y_pos, pixel_size, pixel_size
                              )
         )
@@ -30,25 +64,18 @@ def lightbar_to_pygame(lightbar: LightBar, x_pos: int, y_pos: int, surface) -> N
         start_pos=(x_pos, y_pos + 12),
         end_pos=(x_pos + 31 * pixel_size + 2 * 31 + pixel_size, y_pos + 12)
     )
-    font = pygame.font.SysFont(None, 24)
-    img = font.render(lightbar.label, True, (255, 255, 255))
-    surface.blit(img, (x_pos + 135, y_pos + 13))
+    surface.blit(render_text(lightbar.label, None, 24), (x_pos + 135, y_pos + 13))
+    return pygame.Rect(x_pos, y_pos, 32 * pixel_size + 2 * 31, 35)
 
 
-def dragon_to_pygame(dragon: Dragon, x_pos: int, y_pos: int, surface) -> None:
+def dragon_to_pygame(dragon: Dragon, x_pos: int, y_pos: int, surface) -> pygame.Rect:
     """
-    Draws the dragon in the pygame window at the specified position.
+    Draws the dragon in the pygame window at the specified position. Returns the area it draws in.
     """
-    dragon_icon = pygame.image.load('dragon_icon.png')
-    dragon_icon = pygame.transform.scale(dragon_icon, (100, 100))
-
-    dragon_breath = pygame.image.load('fire.jpg')
-    dragon_breath = pygame.transform.scale(dragon_breath, (50, 50))
-    dragon_breath = pygame.transform.rotate(dragon_breath, 180)
-    surface.blit(dragon_icon, (x_pos, y_pos))
+    surface.blit(load_image('dragon_icon.png', (100, 100)), (x_pos, y_pos))
 
     if dragon.smoke_machine_on:
-        surface.blit(dragon_breath, (x_pos+25, y_pos+100))
+        surface.blit(load_image('fire.jpg', (50, 50), 180), (x_pos+25, y_pos+100))
 
     pygame.draw.rect(
         surface=surface,
@@ -88,40 +115,74 @@ def dragon_to_pygame(dragon: Dragon, x_pos: int, y_pos: int, surface) -> None:
         rect=pygame.Rect(x_pos+65, y_pos+30, 20, 20
                          )
     )
+    return pygame.Rect(x_pos, y_pos, 100, 150)
 
 
-def map_stage_to_pygame(stage: Stage_2023, surface) -> None:
-    surface.fill((0, 0, 0))
-    lightbar_to_pygame(
-        lightbar=stage.lightbar_one,
-        x_pos=5,
-        y_pos=200,
-        surface=surface
-    )
-
-    lightbar_to_pygame(
-        lightbar=stage.lightbar_two,
-        x_pos=405,
-        y_pos=200,
-        surface=surface
-    )
-
-    lightbar_to_pygame(
-        lightbar=stage.lightbar_three,
-        x_pos=805,
-        y_pos=200,
-        surface=surface
-    )
-
-    dragon_to_pygame(stage.dragon_left, 350, 5, surface)
-    dragon_to_pygame(stage.dragon_right, 750, 5, surface)
-
-    font = pygame.font.SysFont("arial", 24)
-    img = font.render(f"Track: {stage.traktor_metadata.current_track_deck_a if stage.traktor_metadata.master_deck == 'A' else stage.traktor_metadata.current_track_deck_b}", True, (255, 255, 255))
+def track_info_to_pygame(stage: Stage_2023, surface) -> pygame.Rect:
+    """
+    Draws the current track title and elapsed time. Returns the area it draws in.
+    """
+    img = render_text(f"Track: {stage.traktor_metadata.active_track.title}", "arial", 24)
     surface.blit(img, (50, 250))
 
-    font = pygame.font.SysFont("arial", 24)
-    img = font.render(f"{stage.traktor_metadata.current_track_elapsed_deck_a if stage.traktor_metadata.master_deck == 'A' else stage.traktor_metadata.current_track_elapsed_deck_b}", True, (255, 255, 255))
+    img = render_text(f"{stage.traktor_metadata.active_elapsed}", "arial", 24)
     surface.blit(img, (550, 250))
+    return pygame.Rect(0, 245, surface.get_width(), surface.get_height() - 245)
+
 
-    pygame.display.flip()
\ No newline at end of file
+def profile_to_pygame(profiler: Profiler, surface) -> pygame.Rect:
+    """
+    Draws the p95 and max time of every profiled stage over the top left corner. Returns the area it draws in.
+    """
+    surface.fill((0, 0, 0), PROFILE_AREA)
+    y_pos = PROFILE_AREA.top
+    for name, summary in sorted(profiler.summary().items()):
+        if "p95_ms" not in summary:
+            continue
+        line = "{:<16} p95 {:6.2f}ms max {:6.2f}ms".format(name, summary["p95_ms"], summary["max_ms"])
+        # Not through render_text, the numbers change every time.
+        surface.blit(get_font("monospace", 14).render(line, True, (255, 255, 255)), (PROFILE_AREA.left, y_pos))
+        y_pos += 16
+        if y_pos > PROFILE_AREA.bottom - 16:
+            break
+    return PROFILE_AREA
+
+
+@profiled("pygame output")
+def map_stage_to_pygame(stage: Stage_2023, surface, change_tracker: typing.Optional[StageChangeTracker] = None) -> None:
+    """
+    Draws the stage in the pygame window.
+    With a change tracker, only the fixtures that changed since the last call are redrawn and pushed to the display.
+    """
+    if change_tracker is None:
+        surface.fill((0, 0, 0))
+        changed = set(stage.fixture_states())
+    else:
+        changed = change_tracker.changed(stage)
+        if not changed:
+            return
+
+    fixtures = {
+        "lightbar_one": lambda: lightbar_to_pygame(lightbar=stage.lightbar_one, x_pos=5, y_pos=200, surface=surface),
+        "lightbar_two": lambda: lightbar_to_pygame(lightbar=stage.lightbar_two, x_pos=405, y_pos=200, surface=surface),
+        "lightbar_three": lambda: lightbar_to_pygame(lightbar=stage.lightbar_three, x_pos=805, y_pos=200, surface=surface),
+        "dragon_left": lambda: dragon_to_pygame(stage.dragon_left, 350, 5, surface),
+        "dragon_right": lambda: dragon_to_pygame(stage.dragon_right, 750, 5, surface),
+        "track_info": lambda: track_info_to_pygame(stage, surface),
+    }
+    dirty_rects = []
+    for name, draw in fixtures.items():
+        if name not in changed:
+            continue
+        if change_tracker is not None and name in change_tracker.areas:
+            # Clear the previous frame of the fixture before drawing on top of it.
+            surface.fill((0, 0, 0), change_tracker.areas[name])
+        area = draw()
+        if change_tracker is not None:
+            change_tracker.areas[name] = area
+            dirty_rects.append(area)
+
+    if change_tracker is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(dirty_rects)
@@ -0,0 +1,121 @@
+from __future__ import print_function
+
+import math
+import queue
+import threading
+import typing
+
+from midi.clock_estimator import PULSES_PER_QUARTER_NOTE
+from midi.midi_input_handler import MidiInputHandler
+from stage.stage import Stage_2023
+from stage.timed_actions import TimedActions
+
+
+class RenderStage:
+    """
+    Runs the designers on their own thread, away from the rtmidi callback thread.
+
+    Install it as the rtmidi callback: the clock thread then only enqueues the MIDI events.
+    The render thread feeds them to the MidiInputHandler, whose callbacks render into the live stage
+    (the back buffer). Once the queue is drained, a snapshot of the completed frame is published by
+    swapping a single reference, so the output loop always reads a consistent frame without locking.
+
+    With latency compensation the designers render ahead of the light (render_ahead seconds), woken up at the
+    pulses the MidiInputHandler predicts. Every frame is published with the time it is meant to be visible, so each
+    output can pick the frame that matches its own latency with frame_for.
+
+    With a frame_rate the render thread also wakes up once per output frame, to sample the effects that are a function
+    of the clock position (the MidiInputHandler's frame callbacks) at that rate.
+
+    The TimedActions (smoke bursts and the like) are run on this thread too, before every frame, and it wakes up
+    when the next one is due.
+    """
+    HISTORY = 64
+    """Frames kept for frame_for on top of the ones published within render_ahead, see history_size."""
+    MAX_BPM = 300
+    """Fastest tempo the history is sized for."""
+
+    def __init__(self, midi_input_handler: MidiInputHandler, stage: Stage_2023, render_ahead: float = 0.0,
+                 frame_rate: typing.Optional[float] = None, timed_actions: typing.Optional[TimedActions] = None):
+        self.midi_input_handler = midi_input_handler
+        self.stage = stage
+        self.render_ahead = render_ahead
+        self.frame_interval = None if frame_rate is None else 1 / frame_rate
+        # Frames are published up to twice per pulse (arrived and predicted) and once per frame. frame_for a latency
+        # up to render_ahead looks back that far, the frames published within render_ahead have to fit.
+        publish_rate = 2 * self.MAX_BPM * PULSES_PER_QUARTER_NOTE / 60 + (frame_rate or 0)
+        self.history_size = self.HISTORY + math.ceil(render_ahead * publish_rate)
+        self.timed_actions = timed_actions
+        self.frame: Stage_2023 = stage.snapshot()
+        """The last completed frame. Read only, a new frame replaces it as a whole."""
+        self.history: typing.Tuple[typing.Tuple[float, Stage_2023], ...] = ((float("-inf"), self.frame),)
+        """Recent frames and when they are meant to be visible, oldest first. Replaced as a whole, like frame."""
+        self.frames_published = 0
+        self._events = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+
+    def __call__(self, event, data=None):
+        self._events.put(event)
+
+    def frame_for(self, visible_at: float) -> Stage_2023:
+        """
+        The frame meant to be visible at visible_at (in the MidiInputHandler's clock): the newest one that is due.
+        Without latency compensation that is the last completed frame.
+        """
+        history = self.history
+        for due, frame in reversed(history):
+            if due <= visible_at:
+                return frame
+        return history[0][1]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._events.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        running = True
+        next_frame = self.midi_input_handler.clock()
+        timeout = None if self.frame_interval is None else 0.0
+        while running:
+            # When the renders fall behind the clock, catch up on everything queued before publishing.
+            try:
+                events = [self._events.get(timeout=timeout)]
+            except queue.Empty:
+                # A predicted pulse, a frame or a timed action is due.
+                events = []
+            try:
+                while True:
+                    events.append(self._events.get_nowait())
+            except queue.Empty:
+                pass
+
+            for event in events:
+                if event is None:
+                    running = False
+                    break
+                self.midi_input_handler(event)
+
+            next_pulse = self.midi_input_handler.advance()
+            now = self.midi_input_handler.clock()
+            if self.timed_actions is not None:
+                self.timed_actions.run_due(now)
+            if self.frame_interval is not None and now >= next_frame:
+                self.midi_input_handler.render_frame()
+                next_frame += self.frame_interval
+                if next_frame <= now:
+                    # Frames that were missed are skipped, not caught up on.
+                    next_frame = now + self.frame_interval
+            wake_ups = [next_pulse]
+            if self.frame_interval is not None:
+                wake_ups.append(next_frame)
+            if self.timed_actions is not None:
+                wake_ups.append(self.timed_actions.next_due())
+            wake_ups = [wake_up for wake_up in wake_ups if wake_up is not None]
+            timeout = max(min(wake_ups) - now, 0.0) if wake_ups else None
+
+            self.frame = self.stage.snapshot()
+            self.history = self.history[-(self.history_size - 1):] + ((now + self.render_ahead, self.frame),)
+            self.frames_published += 1
@@ -1,9 +1,13 @@
 from __future__ import print_function
 
+import copy
 import dataclasses
+import typing
+
+import numpy
 
 from dragon.dragon import Dragon
-from lightbar.lightbar import LightBar
+from lightbar.lightbar import LightBar, PIXELS_PER_LIGHTBAR
 from traktor_metadata import TraktorMetadata
 
 
@@ -18,13 +22,84 @@ class Stage_2023:
     dragon_left: Dragon
     dragon_right: Dragon
     traktor_metadata: TraktorMetadata
+    lightbar_strip: numpy.ndarray
+    """(96, 3) uint8 pixels of all three lightbars, left to right. The lightbars are views into this strip."""
+
+    def snapshot(self) -> "Stage_2023":
+        """
+        Copies the current state of the stage into a new, detached stage.
+        Used to publish completed frames to the output loop, the snapshot is never written to afterwards.
+        The traktor metadata is shared with the live stage, so track info keeps updating without MIDI clock.
+        """
+        lightbar_strip = self.lightbar_strip.copy()
+
+        lightbars = []
+        for lightbar, rgb in [(self.lightbar_one, lightbar_strip[0:32]),
+                              (self.lightbar_two, lightbar_strip[32:64]),
+                              (self.lightbar_three, lightbar_strip[64:96])]:
+            lightbar = copy.copy(lightbar)
+            lightbar.rgb = rgb
+            lightbars.append(lightbar)
+
+        dragons = []
+        for dragon in [self.dragon_left, self.dragon_right]:
+            dragon = copy.copy(dragon)
+            dragon.left_eye = dataclasses.replace(dragon.left_eye)
+            dragon.right_eye = dataclasses.replace(dragon.right_eye)
+            dragons.append(dragon)
+
+        return Stage_2023(
+            lightbar_one=lightbars[0],
+            lightbar_two=lightbars[1],
+            lightbar_three=lightbars[2],
+            dragon_left=dragons[0],
+            dragon_right=dragons[1],
+            traktor_metadata=self.traktor_metadata,
+            lightbar_strip=lightbar_strip
+        )
+
+    def fixture_states(self) -> typing.Dict[str, typing.Hashable]:
+        """
+        A comparable state per fixture (and for the track info), used to find out what changed between frames.
+        """
+        metadata = self.traktor_metadata
+        return {
+            "lightbar_one": self.lightbar_one.rgb.tobytes(),
+            "lightbar_two": self.lightbar_two.rgb.tobytes(),
+            "lightbar_three": self.lightbar_three.rgb.tobytes(),
+            "dragon_left": self.dragon_left.state(),
+            "dragon_right": self.dragon_right.state(),
+            "track_info": (metadata.active_track.title_id, metadata.active_elapsed),
+        }
+
+
+class StageChangeTracker:
+    """
+    Remembers the fixture states an output last sent, so it can skip the fixtures that did not change since.
+    Each output keeps its own tracker.
+    """
+
+    def __init__(self):
+        self.previous: typing.Dict[str, typing.Hashable] = {}
+        self.areas: typing.Dict[str, typing.Any] = {}
+        """Where each fixture was last drawn, for outputs that need to clear it before redrawing."""
+
+    def changed(self, stage: Stage_2023) -> typing.Set[str]:
+        """
+        Returns the names of the fixtures that changed since the last call. Everything has changed on the first call.
+        """
+        states = stage.fixture_states()
+        changed = {name for name, state in states.items() if self.previous.get(name) != state}
+        self.previous = states
+        return changed
 
 
 def create_stage(traktor_metadata: TraktorMetadata) -> Stage_2023:
     # Create some lightbars and dragons
-    lightbar_one = LightBar(label="Left lightbar")
-    lightbar_two = LightBar(label="Middle lightbar")
-    lightbar_three = LightBar(label="Right lightbar")
+    lightbar_strip = numpy.zeros((3 * PIXELS_PER_LIGHTBAR, 3), dtype=numpy.uint8)
+    lightbar_one = LightBar(label="Left lightbar", rgb=lightbar_strip[0:32])
+    lightbar_two = LightBar(label="Middle lightbar", rgb=lightbar_strip[32:64])
+    lightbar_three = LightBar(label="Right lightbar", rgb=lightbar_strip[64:96])
 
     dragon_one = Dragon(label="Left dragon")
     dragon_two = Dragon(label="Right dragon")
@@ -35,5 +110,6 @@ def create_stage(traktor_metadata: TraktorMetadata) -> Stage_2023:
         lightbar_three=lightbar_three,
         dragon_left=dragon_one,
         dragon_right=dragon_two,
-        traktor_metadata=traktor_metadata
+        traktor_metadata=traktor_metadata,
+        lightbar_strip=lightbar_strip
     )
\ No newline at end of file
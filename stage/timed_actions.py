@@ -0,0 +1,51 @@
+from __future__ import print_function
+
+import heapq
+import itertools
+import time
+import typing
+
+
+class TimedActions:
+    """
+    Timed actions on the fixtures (smoke bursts, strobes, fades) that have to happen at a moment that is not a pulse.
+
+    One heap of timestamped actions instead of a thread per action. It is serviced on the render thread, the thread
+    that owns the stage: RenderStage runs the due actions before every frame it publishes and wakes up for the next
+    one. Actions due at the same time run in the order they were scheduled, so a show plays the same every time.
+
+    Not thread safe: schedule from the render thread too (the designers' callbacks).
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._heap: typing.List[typing.Tuple[float, int, typing.Callable[[], None]]] = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def at(self, due: float, action: typing.Callable[[], None]):
+        """
+        Runs action at due, in self.clock's time.
+        """
+        heapq.heappush(self._heap, (due, next(self._order), action))
+
+    def after(self, delay: float, action: typing.Callable[[], None]):
+        self.at(self.clock() + delay, action)
+
+    def next_due(self) -> typing.Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now: typing.Optional[float] = None) -> int:
+        """
+        Runs every action due at now (default self.clock()), oldest first. Returns how many ran.
+        """
+        if now is None:
+            now = self.clock()
+        ran = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, action = heapq.heappop(self._heap)
+            action()
+            ran += 1
+        return ran
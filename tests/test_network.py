@@ -0,0 +1,71 @@
+import pytest
+
+from dmx.network import ArtNetSender, DmxPacket, DmxReceiver, NetworkDmxSender, SacnSender
+from dmx.universe import DMX_UNIVERSE_SIZE
+
+
+def check_round_trip(sender: NetworkDmxSender, receiver: DmxReceiver, protocol: str) -> None:
+    """
+    Sends a few frames on two universes, and checks every packet arrives decoded as it was sent.
+    """
+    expected = []
+    for frame in range(3):
+        sender.channels[:] = bytes((frame + channel) % 256 for channel in range(DMX_UNIVERSE_SIZE))
+        sender.submit()
+        expected.append(DmxPacket(protocol, sender.universe, sender.sequences[sender.universe], bytes(sender.channels)))
+        data = bytes([frame + 1]) * 24
+        sender.send(sender.universe + 1, data)
+        expected.append(DmxPacket(protocol, sender.universe + 1, sender.sequences[sender.universe + 1],
+                                  data + bytes(DMX_UNIVERSE_SIZE - len(data))))
+    for packet in expected:
+        assert receiver.receive() == packet
+
+
+def test_artnet_round_trip():
+    receiver = DmxReceiver()
+    sender = ArtNetSender("127.0.0.1", universe=0x1A3, port=receiver.port)
+    try:
+        check_round_trip(sender, receiver, "artnet")
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_sacn_round_trip():
+    receiver = DmxReceiver()
+    sender = SacnSender("127.0.0.1", universe=7, port=receiver.port)
+    try:
+        check_round_trip(sender, receiver, "sacn")
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_refresh_resends_quiet_universes():
+    receiver = DmxReceiver()
+    now = [0.0]
+    sender = ArtNetSender("127.0.0.1", port=receiver.port, refresh_interval=1.0)
+    sender.clock = lambda: now[0]
+    try:
+        sender.send(0, b"\x05" * DMX_UNIVERSE_SIZE)
+        assert sender.refresh() == 0
+        now[0] = 1.0
+        assert sender.refresh() == 1
+        first, refreshed = receiver.receive(), receiver.receive()
+        assert refreshed.data == first.data
+        assert refreshed.sequence == first.sequence + 1
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_incomplete_sender_fails_on_creation():
+    class NoAddress(NetworkDmxSender):
+        def _packet(self, universe):
+            return bytearray()
+
+        def _set_sequence(self, packet, sequence):
+            pass
+
+    with pytest.raises(TypeError):
+        NoAddress(0)
@@ -0,0 +1,47 @@
+import pytest
+
+from show_file import compile_show_file, load_show_index
+from show_recorder import DMX_DELTA, DMX_KEYFRAME, METADATA, MIDI, ShowRecorder, read_show
+
+
+def record(path, clock):
+    recorder = ShowRecorder(str(path), clock=lambda: clock[0])
+    recorder.start()
+    recorder.midi([248], 0.02)
+    clock[0] = 0.5
+    recorder.metadata("/deckLoaded/1", b'{"value": {}, "elapsed": 1.5}')
+    recorder.dmx(1, bytes(512))
+    clock[0] = 0.52
+    recorder.dmx(1, bytes([0] * 10 + [255, 0, 0, 0, 7] + [0] * 497))
+    recorder.stop()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "show.rec"
+    record(path, [0.0])
+    records = list(read_show(str(path)))
+    assert [r.kind for r in records] == [MIDI, METADATA, DMX_KEYFRAME, DMX_DELTA]
+    assert records[0].message == [248]
+    assert records[1].path == "/deckLoaded/1" and records[1].time == pytest.approx(0.5)
+    assert records[3].data[10:15] == bytes([255, 0, 0, 0, 7]) and len(records[3].data) == 512
+
+
+def test_read_show_rejects_a_show_index(tmp_path):
+    show = tmp_path / "show.json"
+    show.write_text("{}")
+    compile_show_file(str(show), str(tmp_path / "show.json.idx"))
+    with pytest.raises(ValueError):
+        list(read_show(str(tmp_path / "show.json.idx")))
+
+
+def test_load_show_index_rejects_a_recording(tmp_path):
+    path = tmp_path / "show.rec"
+    record(path, [0.0])
+    with pytest.raises(ValueError):
+        load_show_index(str(path))
+    empty = tmp_path / "empty.rec"
+    recorder = ShowRecorder(str(empty))
+    recorder.start()
+    recorder.stop()
+    with pytest.raises(ValueError):
+        load_show_index(str(empty))
@@ -0,0 +1,138 @@
+"""
+Times the lightbar designer per mode: render() on every pulse and beat, and on_frame once per pulse.
+
+Every mode a built-in cue uses is played from the first track and cue that selects it. Checkouts from before the
+cue tables play the tracks in TRACKS instead. BEAT_SQUARE_BOUNCING is not cued on any track, it is driven directly.
+Run it from the repo root, or point --root at another checkout (a git worktree of an older commit) to compare before
+and after:
+
+    python tools/bench_lightbar_modes.py
+    python tools/bench_lightbar_modes.py --root /tmp/before
+"""
+from __future__ import print_function
+
+import argparse
+import inspect
+import math
+import random
+import sys
+import timeit
+
+TRACKS = {
+    "COLOR_WAVE": ("Keep Moving", 140),
+    "RETROWAVE_GRID": ("The Girl and the Robot", 20),
+    "COLOR_WHEEL": ("Lost Woods", 5),
+}
+"""Tracks and positions of the array based strip effects, for checkouts without lightbar_cues."""
+
+
+def cued_modes():
+    """
+    Mode name: (track title, elapsed seconds into the track where a cue selects the mode).
+    """
+    try:
+        from lightbar.lightbar_cues import LIGHTBAR_CUES
+    except ImportError:
+        return dict(TRACKS)
+
+    modes = {}
+    for title, layers in LIGHTBAR_CUES.items():
+        for layer in layers:
+            for cue in layer.cues:
+                if cue.value.mode is None or cue.value.mode.name in modes:
+                    continue
+                start = 0.0 if cue.start == -math.inf else cue.start
+                elapsed = start + 0.5 if cue.end == math.inf else (start + cue.end) / 2
+                modes[cue.value.mode.name] = (title, elapsed)
+    return modes
+
+
+def create_designer(title, elapsed):
+    from lightbar.lightbar_designer import LightbarDesigner
+    from midi.midi_input_handler import MidiInputHandler
+    from stage.stage import create_stage
+    from traktor_metadata import TraktorMetadata
+
+    traktor_metadata = TraktorMetadata()
+    traktor_metadata.master_deck = "A"
+    traktor_metadata.current_track_deck_a = title
+    traktor_metadata.current_track_elapsed_deck_a = elapsed
+    stage = create_stage(traktor_metadata)
+    strip = [stage.lightbar_strip] if "lightbar_strip" in inspect.signature(LightbarDesigner).parameters else []
+    return LightbarDesigner(MidiInputHandler("benchmark"), stage.lightbar_one, stage.lightbar_three,
+                            stage.lightbar_two, traktor_metadata, *strip)
+
+
+def bench(designer, pulses, repeat, before_pulse=None):
+    """
+    Best of repeat runs, in microseconds per call: (render, on_frame). on_frame is None before frame rendering.
+    A mode that fails in the checkout is reported with its error instead of its times.
+    """
+    try:
+        return _bench(designer, pulses, repeat, before_pulse)
+    except Exception as e:
+        return repr(e), None
+
+
+def _bench(designer, pulses, repeat, before_pulse):
+    PULSES_PER_QUARTER_NOTE = 24  # Not imported, older checkouts do not have midi.clock_estimator.
+
+    def play():
+        for _ in range(pulses):
+            if before_pulse is not None:
+                before_pulse()
+            designer.on_pulse()
+            if designer.internal_pulse_counter % PULSES_PER_QUARTER_NOTE == 0:
+                designer.on_beat()
+
+    def frames():
+        for pulse in range(pulses):
+            designer.on_frame(pulse / PULSES_PER_QUARTER_NOTE)
+
+    render_calls = pulses + pulses // PULSES_PER_QUARTER_NOTE
+    render = min(timeit.repeat(play, number=1, repeat=repeat)) / render_calls
+    if not hasattr(designer, "on_frame"):
+        return render * 1e6, None
+    frame = min(timeit.repeat(frames, number=1, repeat=repeat)) / pulses
+    return render * 1e6, frame * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the lightbar designer per mode.")
+    parser.add_argument("--root", default=".", help="Checkout to benchmark.")
+    parser.add_argument("--pulses", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    sys.path.insert(0, args.root)
+
+    try:
+        from lightbar import lightbar_modes
+    except ImportError:
+        from lightbar import lightbar_designer as lightbar_modes
+
+    results = {}
+    for mode, (title, elapsed) in sorted(cued_modes().items()):
+        random.seed(1)
+        results["{} ({})".format(mode, title)] = bench(create_designer(title, elapsed), args.pulses, args.repeat)
+
+    random.seed(1)
+    designer = create_designer("Unknown", 0)
+    designer.traktor_metadata.master_deck_change_handled = True
+
+    def bounce():
+        designer.mode = lightbar_modes.Mode.BEAT_SQUARE_BOUNCING
+        if not isinstance(designer.modestate, lightbar_modes.BeatSquareBounceState):
+            designer.modestate = lightbar_modes.BeatSquareBounceState()
+            designer.modestate.beat_synced = True
+    results["BEAT_SQUARE_BOUNCING (driven)"] = bench(designer, args.pulses, args.repeat, bounce)
+
+    print("{:<56} {:>12} {:>12}".format("mode (track)", "render us", "frame us"))
+    for name, (render, frame) in results.items():
+        if isinstance(render, str):
+            print("{:<56} failed: {}".format(name, render))
+            continue
+        print("{:<56} {:>12.1f} {:>12}".format(name, render, "-" if frame is None else "{:.1f}".format(frame)))
+
+
+if __name__ == "__main__":
+    main()
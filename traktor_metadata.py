@@ -1,15 +1,163 @@
 from __future__ import print_function
 
 import dataclasses
+import threading
+import time
+import typing
+
+_title_ids: typing.Dict[str, int] = {}
+_title_ids_lock = threading.Lock()
+
+
+def intern_title(title: str) -> int:
+    """
+    A small integer id per track title, the same for the lifetime of the process.
+    """
+    title_id = _title_ids.get(title)
+    if title_id is None:
+        with _title_ids_lock:
+            title_id = _title_ids.setdefault(title, len(_title_ids))
+    return title_id
+
+
+@dataclasses.dataclass(frozen=True)
+class ActiveTrack:
+    """
+    The track on the master deck. Only rebuilt when Traktor loads another track on it, or the master deck changes.
+    """
+    version: int
+    """Increases every time the active track changes, cheap to compare for consumers caching per track."""
+    deck: str
+    title: str
+    title_id: int
+
+
+class Playhead:
+    """
+    Estimates the elapsed time of a deck between the updates Traktor sends, which arrive every 50ms at best.
+
+    Each update is timestamped. In between, the elapsed time is extrapolated with the playback rate measured over the
+    updates since the deck last started playing or jumped, so pitched tracks stay on time too. The next update
+    replaces the estimate. A deck that reports the same elapsed time twice is paused, and extrapolation stops after
+    MAX_EXTRAPOLATION when updates stop coming.
+    """
+    MAX_EXTRAPOLATION = 0.25
+    RESYNC_THRESHOLD = 0.1
+    """An update further off the estimate than this is a seek (or a new track), the rate is measured again."""
+    MIN_RATE = 0.0
+    MAX_RATE = 2.0
+
+    def __init__(self, elapsed: float = 0):
+        self.state: typing.Tuple[float, typing.Optional[float], float] = (elapsed, None, 0.0)
+        """Elapsed time, when it was reported and the playback rate. One tuple so readers never see a torn update."""
+        self.anchor: typing.Optional[typing.Tuple[float, float]] = None
+        """Elapsed time and timestamp the rate is measured from."""
+
+    @property
+    def elapsed(self) -> float:
+        """The last elapsed time Traktor reported."""
+        return self.state[0]
+
+    def update(self, elapsed: float, now: float):
+        previous_elapsed, updated_at, rate = self.state
+        if updated_at is None:
+            rate = 0.0
+        elif elapsed == previous_elapsed:
+            rate = 0.0
+            self.anchor = None
+        elif self.anchor is None or abs(self.estimate(now) - elapsed) > self.RESYNC_THRESHOLD or now <= self.anchor[1]:
+            self.anchor = (elapsed, now)
+            rate = 1.0
+        else:
+            anchor_elapsed, anchor_time = self.anchor
+            rate = min(max((elapsed - anchor_elapsed) / (now - anchor_time), self.MIN_RATE), self.MAX_RATE)
+        self.state = (elapsed, now, rate)
+
+    def estimate(self, now: float) -> float:
+        elapsed, updated_at, rate = self.state
+        if updated_at is None:
+            return elapsed
+        return elapsed + rate * min(max(now - updated_at, 0.0), self.MAX_EXTRAPOLATION)
 
 
 @dataclasses.dataclass
 class TraktorMetadata:
-    current_track_deck_a = "N/A"
-    current_track_elapsed_deck_a = 0
+    master_deck_change_handled = False
+
+    def __post_init__(self):
+        self._current_track_deck_a = "N/A"
+        self._current_track_deck_b = "N/A"
+        self._master_deck = "N/A"
+        self.active_track = ActiveTrack(version=0, deck="B", title="N/A", title_id=intern_title("N/A"))
+        self.playheads = {"A": Playhead(), "B": Playhead()}
+        self.clock: typing.Callable[[], float] = time.perf_counter
+        """Timestamps the elapsed time updates. The offline simulator replaces it with its synthetic clock."""
+        self.lookahead = 0.0
+        """Latency compensation: the playhead is read this many seconds ahead, for frames that show up that much later."""
+
+    @property
+    def current_track_elapsed_deck_a(self) -> float:
+        return self.playheads["A"].elapsed
+
+    @current_track_elapsed_deck_a.setter
+    def current_track_elapsed_deck_a(self, elapsed: float):
+        self.playheads["A"].update(elapsed, self.clock())
+
+    @property
+    def current_track_elapsed_deck_b(self) -> float:
+        return self.playheads["B"].elapsed
+
+    @current_track_elapsed_deck_b.setter
+    def current_track_elapsed_deck_b(self, elapsed: float):
+        self.playheads["B"].update(elapsed, self.clock())
+
+    @property
+    def current_track_deck_a(self) -> str:
+        return self._current_track_deck_a
+
+    @current_track_deck_a.setter
+    def current_track_deck_a(self, title: str):
+        self._current_track_deck_a = title
+        self._update_active_track()
+
+    @property
+    def current_track_deck_b(self) -> str:
+        return self._current_track_deck_b
+
+    @current_track_deck_b.setter
+    def current_track_deck_b(self, title: str):
+        self._current_track_deck_b = title
+        self._update_active_track()
+
+    @property
+    def master_deck(self) -> str:
+        return self._master_deck
+
+    @master_deck.setter
+    def master_deck(self, deck: str):
+        self._master_deck = deck
+        self._update_active_track()
+
+    @property
+    def active_elapsed(self) -> float:
+        """
+        Elapsed time of the track on the master deck, as Traktor last reported it.
+        """
+        return self.playheads[self.active_track.deck].elapsed
 
-    current_track_deck_b = "N/A"
-    current_track_elapsed_deck_b = 0
+    def playhead(self) -> float:
+        """
+        Elapsed time of the track on the master deck right now (plus the lookahead), extrapolated since Traktor last
+        reported it.
+        """
+        return self.playheads[self.active_track.deck].estimate(self.clock() + self.lookahead)
 
-    master_deck = "N/A"
-    master_deck_change_handled = False
\ No newline at end of file
+    def _update_active_track(self):
+        deck = "A" if self._master_deck == "A" else "B"
+        title = self._current_track_deck_a if deck == "A" else self._current_track_deck_b
+        if deck == self.active_track.deck and title == self.active_track.title:
+            # The same title again, or a load on the other deck, changes nothing for the designers.
+            return
+        # Published with a single assignment, readers on other threads see the old or the new record, never a mix.
+        self.active_track = ActiveTrack(
+            version=self.active_track.version + 1, deck=deck, title=title, title_id=intern_title(title))